@@ -1,6 +1,5 @@
 from flask import Flask, render_template, session, jsonify, redirect
 from flask_cors import CORS
-from flask_session import Session
 from dotenv import load_dotenv
 from datetime import timedelta
 import os
@@ -8,85 +7,151 @@ import os
 # Load environment variables
 load_dotenv()
 
-# Flask App Configuration
-app = Flask(
-    __name__,
-    template_folder="../frontend/templates",  # Make sure this path is correct
-    static_folder="../frontend/static"
-)
 
-# Secret Key & Session Config
-app.secret_key = os.getenv("SECRET_KEY", "defaultsecretkey")
-app.config["SESSION_TYPE"] = "filesystem"
-app.config["SESSION_PERMANENT"] = False
-app.config["PERMANENT_SESSION_LIFETIME"] = timedelta(days=7)
+# ✅ Application factory: `gunicorn "app:create_app()"`, `flask --app app run`.
+# The only MongoDB work at boot is the index check (MONGO_ENSURE_INDEXES, on by default; turn it
+# off for workers and run `flask db ensure-indexes` at deploy). Each worker opens its own client.
+def create_app(config=None):
+    # Structured JSON logs, written by a background thread (services/logs.py)
+    from services.logs import configure_logging, get_logger
+    configure_logging()
+    logger = get_logger("app")
+
+    # Flask App Configuration
+    app = Flask(
+        __name__,
+        template_folder="../frontend/templates",  # Make sure this path is correct
+        static_folder="../frontend/static"
+    )
+
+    # Secret Key & Session Config
+    app.secret_key = os.getenv("SECRET_KEY", "defaultsecretkey")
+    app.config["PERMANENT_SESSION_LIFETIME"] = timedelta(days=7)
+    app.config["MONGO_ENSURE_INDEXES"] = os.getenv("MONGO_ENSURE_INDEXES", "true").lower() in ("1", "true", "yes")
+    app.config.update(config or {})
+
+    # Uploads are buffered in memory (spilling to disk only past UPLOAD_SPOOL_BYTES); the image
+    # routes cap their own bodies, so /api/import can still take large files
+    from services.uploads import SpooledRequest
+    app.request_class = SpooledRequest
+
+    # Sessions live in MongoDB (shared by every worker/node, expired by a TTL index)
+    from database.db import db
+    from database.session_store import MongoSessionInterface
+    app.session_interface = MongoSessionInterface(
+        db["sessions"],
+        cache_size=int(os.getenv("SESSION_CACHE_SIZE", 0)),
+        cache_ttl=int(os.getenv("SESSION_CACHE_TTL", 30))
+    )
+
+    # Enable CORS
+    CORS(app, supports_credentials=True)
+
+    # Request latency histograms for /metrics
+    from services.metrics import instrument_app
+    instrument_app(app)
+
+    # Make sure MongoDB indexes exist (idempotent; also `flask db ensure-indexes`)
+    if app.config["MONGO_ENSURE_INDEXES"]:
+        from database.indexes import ensure_indexes
+        try:
+            _, index_errors = ensure_indexes(db)
+            for collection, error in index_errors.items():
+                logger.error("Index creation failed", collection=collection, error=error)
+        except Exception as e:
+            logger.error("Could not ensure indexes", error=str(e))
+
+    register_blueprints(app)
+
+    # CLI commands (flask food-index ...)
+    from cli import register_commands
+    register_commands(app)
+
+    register_pages(app)
+    return app
 
-# Enable Flask Session & CORS
-Session(app)
-CORS(app, supports_credentials=True)
 
 # ✅ Register Blueprints
-from routes.auth import auth_bp
-from routes.food import food_bp
-from routes.dashboard import dashboard_bp
-from routes.voice import voice_bp
-from routes.profile import profile_bp
-from routes.image  import image_bp
-from routes.help import help_bp
-from routes.home import home_bp
- 
-app.register_blueprint(auth_bp, url_prefix="/auth")
-app.register_blueprint(food_bp, url_prefix="/food")
-app.register_blueprint(dashboard_bp)  # /dashboard
-app.register_blueprint(voice_bp, url_prefix="/api")
-app.register_blueprint(profile_bp, url_prefix="/profile")
-app.register_blueprint(image_bp, url_prefix="/api")
-app.register_blueprint(help_bp)
-app.register_blueprint(home_bp)
-
-# ✅ Root route: redirect based on session
-@app.route("/")
-def index():
-    if "user_id" in session:
-        return redirect("/dashboard")
-    return redirect("/auth/login")
-@app.route("/")
-def splash():
-    return render_template("splash.html")
-"""@app.route("/guide")
-def guide():
-    return render_template("welcome_guide.html")"""
-@app.route("/guide/step1")
-def guide_step1():
-    return render_template("guide_step1.html")
-
-@app.route("/guide/step2")
-def guide_step2():
-    return render_template("guide_step2.html")
-
-@app.route("/guide/step3")
-def guide_step3():
-    return render_template("guide_step3.html")
-
-
-# ✅ Page to upload image (renders image.html)
-@app.route("/upload-image")
-def upload_image_page():
-    if "user_id" not in session:
+def register_blueprints(app):
+    from routes.auth import auth_bp
+    from routes.food import food_bp
+    from routes.dashboard import dashboard_bp
+    from routes.voice import voice_bp
+    from routes.profile import profile_bp
+    from routes.image  import image_bp
+    from routes.help import help_bp
+    from routes.home import home_bp
+    from routes.stats import stats_bp
+    from routes.history import history_bp
+    from routes.export import export_bp
+    from routes.imports import imports_bp
+    from routes.metrics import metrics_bp
+    from routes.health import health_bp
+    from routes.events import events_bp
+    from routes.quota import quota_bp
+
+    app.register_blueprint(auth_bp, url_prefix="/auth")
+    app.register_blueprint(food_bp, url_prefix="/food")
+    app.register_blueprint(dashboard_bp)  # /dashboard
+    app.register_blueprint(voice_bp, url_prefix="/api")
+    app.register_blueprint(profile_bp, url_prefix="/profile")
+    app.register_blueprint(image_bp, url_prefix="/api")
+    app.register_blueprint(help_bp)
+    app.register_blueprint(home_bp)
+    app.register_blueprint(stats_bp, url_prefix="/api")
+    app.register_blueprint(history_bp, url_prefix="/api")
+    app.register_blueprint(export_bp, url_prefix="/api")
+    app.register_blueprint(imports_bp, url_prefix="/api")
+    app.register_blueprint(metrics_bp)  # /metrics
+    app.register_blueprint(health_bp)  # /healthz, /readyz
+    app.register_blueprint(events_bp, url_prefix="/api")
+    app.register_blueprint(quota_bp, url_prefix="/api")
+
+
+def register_pages(app):
+    # ✅ Root route: redirect based on session
+    @app.route("/")
+    def index():
+        if "user_id" in session:
+            return redirect("/dashboard")
         return redirect("/auth/login")
-    return render_template("image.html")
+    @app.route("/")
+    def splash():
+        return render_template("splash.html")
+    """@app.route("/guide")
+    def guide():
+        return render_template("welcome_guide.html")"""
+    @app.route("/guide/step1")
+    def guide_step1():
+        return render_template("guide_step1.html")
+
+    @app.route("/guide/step2")
+    def guide_step2():
+        return render_template("guide_step2.html")
+
+    @app.route("/guide/step3")
+    def guide_step3():
+        return render_template("guide_step3.html")
+
+
+    # ✅ Page to upload image (renders image.html)
+    @app.route("/upload-image")
+    def upload_image_page():
+        if "user_id" not in session:
+            return redirect("/auth/login")
+        return render_template("image.html")
 
-# ✅ Check session state
-@app.route("/session-check")
-def session_check():
-    return jsonify({"logged_in": "user_id" in session})
+    # ✅ Check session state
+    @app.route("/session-check")
+    def session_check():
+        return jsonify({"logged_in": "user_id" in session})
 
-# ✅ 404 Error Handler
-@app.errorhandler(404)
-def not_found(e):
-    return jsonify({"error": "Not Found"}), 404
+    # ✅ 404 Error Handler
+    @app.errorhandler(404)
+    def not_found(e):
+        return jsonify({"error": "Not Found"}), 404
 
 # ✅ Run App
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
-    app.run(host="0.0.0.0", port=port)
+    create_app().run(host="0.0.0.0", port=port)
@@ -0,0 +1,84 @@
+"""Peak RSS of the export stream as the number of exported rows grows.
+
+    python -m benchmarks.bench_export --rows 10000 100000 1000000 --format csv --gzip
+
+Each size runs in a fresh interpreter so ru_maxrss reflects only that export.
+Rows are synthesized lazily, standing in for the Mongo cursor.
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+from services.export import stream_export
+
+
+def fake_cursor(rows):
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    for i in range(rows):
+        yield {
+            "_id": ObjectId(),
+            "timestamp": start + timedelta(minutes=17 * i),
+            "food_name": f"food {i % 500}",
+            "meal_type": ("Breakfast", "Lunch", "Dinner", "Snack")[i % 4],
+            "calories": 100 + i % 400,
+            "protein": i % 30,
+            "carbs": i % 60,
+            "fat": i % 25,
+        }
+
+
+def max_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_single(rows, fmt, gzip):
+    baseline = max_rss_mb()
+    started = time.perf_counter()
+    total = 0
+    for chunk in stream_export(fake_cursor(rows), fmt, gzip):
+        total += len(chunk)
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        "rows": rows,
+        "format": fmt,
+        "gzip": gzip,
+        "bytes": total,
+        "seconds": round(elapsed, 2),
+        "rows_per_sec": round(rows / elapsed) if elapsed else None,
+        "baseline_rss_mb": baseline,
+        "peak_rss_mb": max_rss_mb(),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        return run_single(args.rows[0], args.format, args.gzip)
+
+    results = []
+    for rows in args.rows:
+        cmd = [sys.executable, "-m", "benchmarks.bench_export", "--single", "--rows", str(rows), "--format", args.format]
+        if args.gzip:
+            cmd.append("--gzip")
+        out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
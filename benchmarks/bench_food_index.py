@@ -0,0 +1,100 @@
+"""Local food index lookups vs. a Nutritionix round trip.
+
+    python -m benchmarks.bench_food_index --foods 5000 --queries 2000
+    python -m benchmarks.bench_food_index --api-url https://trackapi.nutritionix.com
+
+Without --api-url the round trip goes to a local fake server with --latency
+seconds of simulated upstream delay.
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from benchmarks.fake_nutritionix import start_fake_server
+from services.food_index import FoodIndex
+from services.nutritionix import NutritionixClient
+
+WORDS = ["paneer", "dal", "roti", "rice", "chai", "idli", "dosa", "sambar", "poha", "upma",
+         "chicken", "egg", "curd", "aloo", "gobi", "rajma", "chole", "masala", "butter", "tikka"]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarize(samples):
+    return {
+        "count": len(samples),
+        "mean_ms": round(statistics.mean(samples) * 1000, 4),
+        "p50_ms": round(percentile(samples, 50) * 1000, 4),
+        "p99_ms": round(percentile(samples, 99) * 1000, 4),
+    }
+
+
+def build_index(size, rng):
+    index = FoodIndex()
+    names = set()
+    while len(names) < size:
+        names.add(" ".join(rng.sample(WORDS, rng.choice((1, 2, 3)))) + f" {len(names)}")
+    for name in names:
+        index.add({
+            "food_name": name, "serving_qty": 1, "serving_unit": "serving",
+            "nf_calories": rng.randint(50, 500), "nf_protein": 5, "nf_total_carbohydrate": 20, "nf_total_fat": 5,
+        })
+    return index, sorted(names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--foods", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--api-calls", type=int, default=50)
+    parser.add_argument("--api-url", help="real or fake Nutritionix base URL")
+    parser.add_argument("--latency", type=float, default=0.15, help="fake server latency in seconds")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    index, names = build_index(args.foods, rng)
+
+    exact, fuzzy = [], []
+    for _ in range(args.queries):
+        name = rng.choice(names)
+        started = time.perf_counter()
+        index.resolve(f"2 {name}")
+        exact.append(time.perf_counter() - started)
+
+        typo = name[:-2] if len(name) > 6 else name
+        started = time.perf_counter()
+        index.resolve(typo)
+        fuzzy.append(time.perf_counter() - started)
+
+    server = None
+    base_url = args.api_url
+    if not base_url:
+        server, base_url = start_fake_server(latency=args.latency)
+    api_client = NutritionixClient(base_url=base_url, max_retries=0)
+
+    api = []
+    for _ in range(args.api_calls):
+        started = time.perf_counter()
+        api_client.natural_nutrients(f"2 {rng.choice(WORDS)}")
+        api.append(time.perf_counter() - started)
+
+    if server:
+        server.shutdown()
+
+    print(json.dumps({
+        "index_entries": len(index),
+        "index_exact": summarize(exact),
+        "index_fuzzy": summarize(fuzzy),
+        "api_round_trip": summarize(api),
+        "api_url": base_url,
+        "speedup_p99": round(percentile(api, 99) / max(percentile(exact + fuzzy, 99), 1e-9), 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
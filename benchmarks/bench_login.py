@@ -0,0 +1,98 @@
+"""Login throughput and tail latency at several password hash costs.
+
+    python -m benchmarks.bench_login --concurrency 16 --logins 400
+    python -m benchmarks.bench_login --methods scrypt:16384:8:1 scrypt:32768:8:1 pbkdf2:sha256:600000
+
+Each login is a password verification on the bounded hash pool, the part of
+/auth/login that dominates its cost; users are held in memory, standing in for
+the indexed users lookup. --rehash stores hashes with an older method so every
+login also pays for the upgrade.
+"""
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+
+from werkzeug.security import generate_password_hash
+
+from services.passwords import HashPool, HashPoolBusy
+
+DEFAULT_METHODS = ["pbkdf2:sha256:600000", "scrypt:16384:8:1", "scrypt:32768:8:1", "scrypt:65536:8:1"]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(method, users, logins, concurrency, workers, queued, rehash):
+    stored_method = "pbkdf2:sha256:1000" if rehash else method
+    stored = {f"user{i}@example.com": generate_password_hash(f"password-{i}", stored_method) for i in range(users)}
+    pool = HashPool(workers=workers, queued=queued, wait=30, method=method)
+    pool.needs_rehash(next(iter(stored.values())))
+
+    latencies, rejected = [], [0]
+    lock = threading.Lock()
+    counter = iter(range(logins))
+
+    def client():
+        while True:
+            with lock:
+                n = next(counter, None)
+            if n is None:
+                return
+            i = n % users
+            started = time.perf_counter()
+            try:
+                ok, _ = pool.verify(stored[f"user{i}@example.com"], f"password-{i}")
+                assert ok
+            except HashPoolBusy:
+                with lock:
+                    rejected[0] += 1
+                continue
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    return {
+        "method": method,
+        "logins": len(latencies),
+        "rejected": rejected[0],
+        "concurrency": concurrency,
+        "workers": workers,
+        "logins_per_sec": round(len(latencies) / wall, 1),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "rehashed": pool.stats()["rehashed"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--methods", nargs="+", default=DEFAULT_METHODS)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--queued", type=int, default=32)
+    parser.add_argument("--rehash", action="store_true")
+    args = parser.parse_args()
+
+    results = [run(method, args.users, args.logins, args.concurrency, args.workers, args.queued, args.rehash)
+               for method in args.methods]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Local stand-in for the Nutritionix API used by the benchmarks.
+
+    python -m benchmarks.fake_nutritionix --port 8765 --latency 0.2
+
+then point the app at it with NUTRITIONIX_BASE_URL=http://127.0.0.1:8765.
+"""
+import argparse
+import hashlib
+import json
+import re
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+_SPLIT_ITEMS = re.compile(r"\s*(?:,|&|\n|\band\b|\bwith\b)\s*")
+_QUANTITY = re.compile(r"^(\d+(?:\.\d+)?)\s+")
+
+
+def fake_food(phrase):
+    phrase = phrase.strip().lower()
+    qty = 1.0
+    match = _QUANTITY.match(phrase)
+    if match:
+        qty = float(match.group(1))
+        phrase = phrase[match.end():]
+    # Deterministic per name so repeated runs are comparable
+    seed = int(hashlib.md5(phrase.encode()).hexdigest()[:8], 16)
+    calories = 50 + seed % 400
+    return {
+        "food_name": phrase,
+        "serving_qty": qty,
+        "serving_unit": "serving",
+        "serving_weight_grams": 100 * qty,
+        "nf_calories": round(calories * qty, 2),
+        "nf_protein": round((seed % 30) * qty, 2),
+        "nf_total_carbohydrate": round((seed % 60) * qty, 2),
+        "nf_total_fat": round((seed % 25) * qty, 2),
+    }
+
+
+def make_handler(latency, stats):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status, body):
+            out = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+
+        def do_POST(self):
+            stats["requests"] += 1
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if latency:
+                time.sleep(latency)
+            if urlparse(self.path).path != "/v2/natural/nutrients":
+                return self._reply(404, {"message": "resource not found"})
+
+            phrases = [p for p in _SPLIT_ITEMS.split(body.get("query", "")) if p]
+            if not phrases:
+                return self._reply(404, {"message": "We couldn't match any of your foods"})
+            self._reply(200, {"foods": [fake_food(p) for p in phrases]})
+
+        def do_GET(self):
+            stats["requests"] += 1
+            if latency:
+                time.sleep(latency)
+            url = urlparse(self.path)
+            if url.path != "/v2/search/item":
+                return self._reply(404, {"message": "resource not found"})
+
+            upc = parse_qs(url.query).get("upc", [""])[0]
+            # Codes starting with 0000 play the part of unknown products
+            if not upc or upc.startswith("0000"):
+                return self._reply(404, {"message": "resource not found"})
+            food = fake_food(f"item {upc}")
+            food["nix_item_id"] = upc
+            self._reply(200, {"foods": [food]})
+
+    return Handler
+
+
+def start_fake_server(latency=0.0, host="127.0.0.1", port=0):
+    stats = {"requests": 0}
+    server = ThreadingHTTPServer((host, port), make_handler(latency, stats))
+    server.daemon_threads = True
+    server.stats = stats
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds added to every response")
+    args = parser.parse_args()
+
+    server, url = start_fake_server(args.latency, args.host, args.port)
+    print(f"Fake Nutritionix listening on {url} (latency {args.latency}s)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
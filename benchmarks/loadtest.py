@@ -0,0 +1,395 @@
+"""Endpoint load test: throughput and p50/p95/p99 per endpoint at fixed concurrency.
+
+    python -m benchmarks.loadtest --users 2000 --months 3 --concurrency 1 8 32 --duration 20
+    python -m benchmarks.loadtest --mongo-uri mongodb://127.0.0.1:27018 --reset --latency 0.3
+    python -m benchmarks.loadtest --app-url http://127.0.0.1:8000 --mongo-uri mongodb://... --skip-seed
+
+By default a throwaway mongod is started on a free port with its data directory
+on tmpfs (/dev/shm when available), so the whole dataset lives in memory, and
+removed afterwards. The app runs in a separate process (werkzeug, threaded) so
+the load generator doesn't share its GIL; --app-url targets a server you
+started yourself (gunicorn etc.) against the same database.
+
+Nutritionix is replaced by benchmarks.fake_nutritionix with --latency seconds
+of delay per call. Results are written as JSON (--output) for comparing runs.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytz
+import requests
+from bson import ObjectId
+from pymongo import MongoClient
+
+from benchmarks.fake_nutritionix import start_fake_server
+
+DB_NAME = "calorie_tracker"
+PASSWORD = "loadtest-password"
+ENDPOINTS = ["login", "food_log", "voice_log", "dashboard", "delete"]
+
+FOODS = ["roti", "dal", "rice", "paneer tikka", "chai", "idli", "dosa", "sambar", "poha", "upma",
+         "chicken curry", "boiled egg", "curd", "aloo gobi", "rajma", "chole", "banana", "apple",
+         "oats", "toast", "omelette", "salad", "biryani", "khichdi"]
+MEAL_HOURS = [("Breakfast", 8), ("Lunch", 13), ("Snack", 17), ("Dinner", 20)]
+# Most users keep the default zone; the rest exercise the per-user boundaries
+TIMEZONES = ["Asia/Kolkata"] * 8 + ["Europe/London", "America/New_York"]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until(check, timeout, what):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if check():
+                return
+        except Exception:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {what}")
+
+
+# --------------------------
+# MONGO
+# --------------------------
+
+def start_mongod(binary):
+    path = shutil.which(binary)
+    if not path:
+        raise SystemExit(f"{binary} not found on PATH; pass --mongod PATH or --mongo-uri")
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    dbpath = tempfile.mkdtemp(prefix="loadtest-mongod-", dir=base)
+    port = free_port()
+    proc = subprocess.Popen(
+        [path, "--dbpath", dbpath, "--port", str(port), "--bind_ip", "127.0.0.1", "--quiet",
+         "--wiredTigerCacheSizeGB", "1"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    uri = f"mongodb://127.0.0.1:{port}"
+    client = MongoClient(uri, serverSelectionTimeoutMS=500)
+    wait_until(lambda: client.admin.command("ping"), 30, "mongod")
+    client.close()
+
+    def stop():
+        proc.terminate()
+        proc.wait(10)
+        shutil.rmtree(dbpath, ignore_errors=True)
+    return uri, stop
+
+
+# --------------------------
+# DATA
+# --------------------------
+
+# ✅ Users with months of meals (3-5 a day) plus the matching daily_totals rollup.
+# Every user shares one password hash so seeding doesn't spend minutes hashing.
+def seed(database, users, months, seed_value=42):
+    from werkzeug.security import generate_password_hash
+    from services.passwords import PASSWORD_HASH_METHOD
+
+    rng = random.Random(seed_value)
+    password_hash = generate_password_hash(PASSWORD, PASSWORD_HASH_METHOD)
+    now = datetime.now(timezone.utc)
+    days = months * 30
+
+    user_docs = []
+    for i in range(users):
+        user_docs.append({
+            "_id": ObjectId(),
+            "name": f"Load Test {i}",
+            "email": f"loadtest{i}@example.com",
+            "password": password_hash,
+            "goal_calories": rng.choice([1600, 1800, 2000, 2200, 2500]),
+            "timezone": rng.choice(TIMEZONES),
+        })
+    database.users.insert_many(user_docs)
+
+    recent = {}
+    meals_written = 0
+    batch, totals = [], {}
+    started = time.perf_counter()
+    for user in user_docs:
+        user_id = str(user["_id"])
+        tz = pytz.timezone(user["timezone"])
+        today = now.astimezone(tz).date()
+        for offset in range(days, 0, -1):
+            day = today - timedelta(days=offset)
+            for meal_type, hour in rng.sample(MEAL_HOURS, rng.randint(3, 4)):
+                food = rng.choice(FOODS)
+                local = tz.localize(datetime(day.year, day.month, day.day, hour, rng.randint(0, 59)))
+                meal = {
+                    "_id": ObjectId(),
+                    "user_id": user_id,
+                    "food_name": food,
+                    "calories": rng.randint(80, 650),
+                    "protein": rng.randint(0, 35),
+                    "carbs": rng.randint(0, 90),
+                    "fat": rng.randint(0, 30),
+                    "meal_type": meal_type,
+                    "timestamp": local.astimezone(timezone.utc),
+                }
+                batch.append(meal)
+                day_totals = totals.setdefault((user_id, day.isoformat()),
+                                               {"calories": 0, "protein": 0, "carbs": 0, "fat": 0, "meals": 0})
+                for field in ("calories", "protein", "carbs", "fat"):
+                    day_totals[field] += meal[field]
+                day_totals["meals"] += 1
+                if offset <= 7:
+                    recent.setdefault(user_id, []).append(str(meal["_id"]))
+        if len(batch) >= 10000:
+            database.foods.insert_many(batch, ordered=False)
+            meals_written += len(batch)
+            batch = []
+    if batch:
+        database.foods.insert_many(batch, ordered=False)
+        meals_written += len(batch)
+
+    rollups = [dict(t, user_id=u, date=d, updated_at=now) for (u, d), t in totals.items()]
+    for start in range(0, len(rollups), 10000):
+        database.daily_totals.insert_many(rollups[start:start + 10000], ordered=False)
+
+    return {
+        "users": users,
+        "meals": meals_written,
+        "daily_totals": len(rollups),
+        "seconds": round(time.perf_counter() - started, 1),
+        "emails": [u["email"] for u in user_docs],
+        "recent_meals": recent,
+        "user_ids": {u["email"]: str(u["_id"]) for u in user_docs},
+    }
+
+
+def load_existing(database, users):
+    docs = list(database.users.find({"email": {"$regex": "^loadtest"}}, {"email": 1}).limit(users))
+    if not docs:
+        raise SystemExit("No loadtest users in the database; run without --skip-seed first")
+    since = datetime.now(timezone.utc) - timedelta(days=7)
+    recent = {}
+    for doc in docs:
+        user_id = str(doc["_id"])
+        recent[user_id] = [str(m["_id"]) for m in database.foods.find(
+            {"user_id": user_id, "timestamp": {"$gte": since}}, {"_id": 1})]
+    return {"emails": [d["email"] for d in docs], "recent_meals": recent,
+            "user_ids": {d["email"]: str(d["_id"]) for d in docs}}
+
+
+# --------------------------
+# APP SERVER
+# --------------------------
+
+def serve(port):
+    from werkzeug.serving import run_simple
+    from app import create_app
+    run_simple("127.0.0.1", port, create_app(), threaded=True)
+
+
+def start_app(mongo_uri, nutritionix_url):
+    port = free_port()
+    env = dict(os.environ, MONGO_URI=mongo_uri, NUTRITIONIX_BASE_URL=nutritionix_url,
+               NUTRITIONIX_APP_ID="loadtest", NUTRITIONIX_API_KEY="loadtest")
+    proc = subprocess.Popen([sys.executable, "-m", "benchmarks.loadtest", "--serve", str(port)],
+                            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    wait_until(lambda: requests.get(f"{url}/healthz", timeout=1).ok, 60, "the app server")
+
+    def stop():
+        proc.terminate()
+        proc.wait(10)
+    return url, stop
+
+
+# --------------------------
+# LOAD
+# --------------------------
+
+def login(http, base_url, email):
+    return http.post(f"{base_url}/auth/login", data={"email": email, "password": PASSWORD},
+                     allow_redirects=False, timeout=30)
+
+
+# One virtual user: a logged-in session plus the ids of meals it may delete
+class VirtualUser:
+    def __init__(self, base_url, email, meal_ids, rng):
+        self.base_url = base_url
+        self.email = email
+        self.meal_ids = meal_ids
+        self.rng = rng
+        self.http = requests.Session()
+        login(self.http, base_url, email)
+
+    def call(self, endpoint):
+        url = self.base_url
+        if endpoint == "login":
+            return login(requests.Session(), url, self.email)
+        if endpoint == "food_log":
+            return self.http.post(f"{url}/food/log", timeout=30, json={
+                "query": f"{self.rng.randint(1, 3)} {self.rng.choice(FOODS)}", "meal_type": "Meal"})
+        if endpoint == "voice_log":
+            a, b = self.rng.sample(FOODS, 2)
+            return self.http.post(f"{url}/api/voice-log", json={"query": f"{a} and {b}"}, timeout=30)
+        if endpoint == "dashboard":
+            return self.http.get(f"{url}/api/dashboard", timeout=30)
+        if endpoint == "delete":
+            if not self.meal_ids:
+                return None
+            return self.http.delete(f"{url}/food/delete/{self.meal_ids.pop()}", timeout=30)
+        raise ValueError(endpoint)
+
+
+def run_level(vusers, endpoint, concurrency, duration):
+    latencies, statuses, errors = [], {}, [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def worker(vuser):
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            try:
+                response = vuser.call(endpoint)
+            except requests.RequestException:
+                with lock:
+                    errors[0] += 1
+                continue
+            if response is None:
+                return
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    threads = [threading.Thread(target=worker, args=(vusers[i],)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    result = {"endpoint": endpoint, "concurrency": concurrency, "requests": len(latencies),
+              "connection_errors": errors[0], "status": {str(k): v for k, v in sorted(statuses.items())},
+              "seconds": round(wall, 2), "throughput_rps": round(len(latencies) / wall, 1) if wall else 0}
+    if latencies:
+        result.update({
+            "mean_ms": round(statistics.mean(latencies) * 1000, 2),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "max_ms": round(max(latencies) * 1000, 2),
+        })
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", help="Use this server instead of starting a throwaway mongod.")
+    parser.add_argument("--mongod", default="mongod", help="mongod binary for the throwaway server.")
+    parser.add_argument("--reset", action="store_true", help="Drop the app database on --mongo-uri first.")
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse loadtest users already in the database.")
+    parser.add_argument("--app-url", help="Drive this server instead of starting one.")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--months", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake Nutritionix delay in seconds.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=15, help="Seconds per endpoint and level.")
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=ENDPOINTS)
+    parser.add_argument("--output", default=f"loadtest-{datetime.now():%Y%m%d-%H%M%S}.json")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve(args.serve)
+
+    cleanup = []
+    try:
+        if args.mongo_uri:
+            mongo_uri = args.mongo_uri
+        else:
+            mongo_uri, stop_mongod = start_mongod(args.mongod)
+            cleanup.append(stop_mongod)
+
+        client = MongoClient(mongo_uri)
+        database = client[DB_NAME]
+        if args.skip_seed:
+            data = load_existing(database, args.users)
+        else:
+            if args.reset:
+                client.drop_database(DB_NAME)
+            elif database.users.estimated_document_count():
+                raise SystemExit(f"{DB_NAME} on {mongo_uri} already has users; pass --reset or --skip-seed")
+            from database.indexes import ensure_indexes
+            ensure_indexes(database)
+            print(f"Seeding {args.users} users x {args.months} months...", file=sys.stderr)
+            data = seed(database, args.users, args.months)
+            print(f"Seeded {data['meals']} meals in {data['seconds']}s", file=sys.stderr)
+
+        fake, nutritionix_url = start_fake_server(args.latency)
+        cleanup.append(fake.shutdown)
+        if args.app_url:
+            base_url = args.app_url.rstrip("/")
+        else:
+            base_url, stop_app = start_app(mongo_uri, nutritionix_url)
+            cleanup.append(stop_app)
+
+        rng = random.Random(7)
+        emails = rng.sample(data["emails"], min(len(data["emails"]), max(args.concurrency)))
+        vusers = [VirtualUser(base_url, email, list(data["recent_meals"].get(data["user_ids"][email], [])),
+                              random.Random(i)) for i, email in enumerate(emails)]
+
+        results = []
+        for endpoint in args.endpoints:
+            for concurrency in args.concurrency:
+                result = run_level(vusers, endpoint, min(concurrency, len(vusers)), args.duration)
+                results.append(result)
+                print(f"{endpoint:>10} c={concurrency:<3} {result['throughput_rps']:>8} rps  "
+                      f"p50={result.get('p50_ms')}ms p95={result.get('p95_ms')}ms p99={result.get('p99_ms')}ms "
+                      f"status={result['status']}", file=sys.stderr)
+
+        report = {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "config": {k: v for k, v in vars(args).items() if k != "serve"},
+            "dataset": {k: data[k] for k in ("users", "meals", "daily_totals", "seconds") if k in data},
+            "nutritionix_calls": fake.stats["requests"],
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}", file=sys.stderr)
+    finally:
+        for stop in reversed(cleanup):
+            try:
+                stop()
+            except Exception as e:
+                print("❌ Cleanup error:", e, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
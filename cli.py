@@ -0,0 +1,148 @@
+import click
+from flask.cli import AppGroup
+
+from database.db import client, db
+from database.indexes import ensure_indexes, explain_hot_queries, check_query_plans_scratch
+from services import food_index
+from services.meals import rebuild_daily_totals
+from services.importer import import_meals
+from services.notifications import run_notification_job, NOTIFICATION_WORKERS
+
+# --------------------------
+# DATABASE
+# --------------------------
+
+db_cli = AppGroup("db", help="MongoDB maintenance.")
+
+
+@db_cli.command("ensure-indexes")
+def ensure_indexes_command():
+    """Create every index in the registry (safe to re-run)."""
+    created, errors = ensure_indexes(db)
+    for collection, names in created.items():
+        click.echo(f"{collection}: {', '.join(names)}")
+    for collection, error in errors.items():
+        click.echo(f"{collection}: FAILED {error}", err=True)
+    if errors:
+        raise SystemExit(1)
+
+
+@db_cli.command("check-plans")
+@click.option("--scratch", is_flag=True, help="Explain against a throwaway database seeded with sample rows.")
+def check_plans_command(scratch):
+    """Explain every hot query and fail if any of them uses a COLLSCAN."""
+    results = check_query_plans_scratch(client) if scratch else explain_hot_queries(db)
+    for result in results:
+        status = "COLLSCAN" if result["collscan"] else "ok"
+        click.echo(f"[{status}] {result['query']} ({result['collection']}): {' <- '.join(result['stages'])}")
+    if any(result["collscan"] for result in results):
+        raise SystemExit(1)
+
+
+# --------------------------
+# LOCAL FOOD INDEX
+# --------------------------
+
+food_index_cli = AppGroup("food-index", help="Manage the local food-nutrient index.")
+
+
+@food_index_cli.command("seed")
+def seed_food_index():
+    """Copy foods from cached Nutritionix responses into the index."""
+    added = food_index.seed_from_cache()
+    click.echo(f"Seeded {added} foods from nutrient_cache")
+
+
+@food_index_cli.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+def import_food_index(path):
+    """Import foods from a CSV file.
+
+    Columns: food_name, serving_qty, serving_unit, serving_weight_grams,
+    calories, protein, carbs, fat, aliases (separated by ';').
+    """
+    added, skipped = food_index.import_csv(path)
+    click.echo(f"Imported {added} foods ({skipped} rows skipped)")
+
+
+# --------------------------
+# DAILY TOTALS ROLLUP
+# --------------------------
+
+daily_totals_cli = AppGroup("daily-totals", help="Maintain the per-user daily_totals rollup.")
+
+
+@daily_totals_cli.command("rebuild")
+@click.option("--user", "user_id", help="Only this user id.")
+@click.option("--since", help="Only days on or after this date (YYYY-MM-DD).")
+@click.option("--check", is_flag=True, help="Report drift without writing.")
+def rebuild_totals(user_id, since, check):
+    """Recompute daily totals from the foods collection."""
+    result = rebuild_daily_totals(user_id=user_id, since=since, dry_run=check)
+    verb = "Found" if check else "Fixed"
+    click.echo(f"{result['days']} user-days scanned. {verb} {len(result['drifted'])} drifted "
+               f"and {len(result['stale'])} stale rollups.")
+    for user, date in (result["drifted"] + result["stale"])[:20]:
+        click.echo(f"  {user} {date}")
+    if check and (result["drifted"] or result["stale"]):
+        raise SystemExit(1)
+
+
+# --------------------------
+# FOOD LOG IMPORT
+# --------------------------
+
+food_log_cli = AppGroup("food-log", help="Import users' food history.")
+
+
+@food_log_cli.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--user-id", help="Owner of the imported entries.")
+@click.option("--email", help="Owner of the imported entries, looked up by email.")
+@click.option("--format", "fmt", type=click.Choice(["csv", "ndjson"]), help="Defaults to the file extension.")
+@click.option("--chunk-size", type=int, default=1000, show_default=True)
+def import_food_log(path, user_id, email, fmt, chunk_size):
+    """Import a CSV/NDJSON food history (same columns as /api/export)."""
+    if bool(user_id) == bool(email):
+        raise click.UsageError("Pass exactly one of --user-id or --email")
+    if email:
+        user = db["users"].find_one({"email": email}, {"_id": 1})
+        if not user:
+            raise click.UsageError(f"No user with email {email}")
+        user_id = str(user["_id"])
+
+    fmt = fmt or ("ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv")
+    with open(path, "rb") as f:
+        summary = import_meals(f, fmt, user_id, chunk_size=chunk_size)
+
+    click.echo(f"{summary['rows']} rows: {summary['inserted']} inserted, {summary['invalid']} invalid, "
+               f"{summary['failed_inserts']} failed inserts")
+    for chunk in summary["chunks"]:
+        for error in chunk["errors"]:
+            click.echo(f"  line {error['line']}: {error['error']}", err=True)
+
+
+# --------------------------
+# EVENING NOTIFICATIONS
+# --------------------------
+
+notifications_cli = AppGroup("notifications", help="Precompute the 8PM dashboard notifications.")
+
+
+@notifications_cli.command("compute")
+@click.option("--workers", type=int, default=NOTIFICATION_WORKERS, show_default=True,
+              help="Processes; users are split between them by _id range.")
+@click.option("--buckets", type=int, help="Number of _id ranges (default: 4 per worker).")
+def compute_notifications(workers, buckets):
+    """Compute today's consumed-vs-goal message for every user (schedule e.g. every 30 min)."""
+    summary = run_notification_job(workers=workers, buckets=buckets)
+    click.echo(f"{summary['users']} users ({summary['active_today']} logged today) in {summary['seconds']}s "
+               f"across {summary['ranges']} ranges: {summary['users_per_sec']} users/sec")
+
+
+def register_commands(app):
+    app.cli.add_command(db_cli)
+    app.cli.add_command(food_index_cli)
+    app.cli.add_command(daily_totals_cli)
+    app.cli.add_command(food_log_cli)
+    app.cli.add_command(notifications_cli)
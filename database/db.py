@@ -1,8 +1,118 @@
 from pymongo import MongoClient
 import os
+import threading
 from dotenv import load_dotenv
+from database.monitoring import CommandTimer
+from services.metrics import METRICS_ENABLED
 
 load_dotenv()
 
-client = MongoClient(os.getenv("MONGO_URI"))
-db = client.get_database("calorie_tracker")
+MONGO_URI = os.getenv("MONGO_URI")
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "calorie_tracker")
+
+# ✅ Pool and timeouts; size the pool to the worker's thread count, not the whole fleet
+MONGO_OPTIONS = {
+    "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", 50)),
+    "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", 0)),
+    "maxIdleTimeMS": int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 300000)),
+    "connectTimeoutMS": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 5000)),
+    "serverSelectionTimeoutMS": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000)),
+    "socketTimeoutMS": int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 30000)),
+    "waitQueueTimeoutMS": int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000)),
+}
+
+_lock = threading.Lock()
+_state = {"client": None, "pid": None}
+
+
+# ✅ One MongoClient per process, created on first use. A client must never cross a fork
+# (its pool and monitor threads belong to the parent), so a forked worker builds its own.
+def get_client():
+    pid = os.getpid()
+    if _state["client"] is None or _state["pid"] != pid:
+        with _lock:
+            if _state["client"] is None or _state["pid"] != pid:
+                # Command timings feed /metrics (mongodb_command_duration_seconds)
+                listeners = [CommandTimer()] if METRICS_ENABLED else []
+                _state["client"] = MongoClient(MONGO_URI, event_listeners=listeners, **MONGO_OPTIONS)
+                _state["pid"] = pid
+    return _state["client"]
+
+
+def get_db():
+    return get_client()[MONGO_DB_NAME]
+
+
+def close_client():
+    with _lock:
+        if _state["client"] is not None and _state["pid"] == os.getpid():
+            _state["client"].close()
+        _state["client"] = None
+
+
+def _forget_after_fork():
+    # Don't close: the sockets are shared with the parent. Just stop using them.
+    _state["client"] = None
+
+
+os.register_at_fork(after_in_child=_forget_after_fork)
+
+
+def ping():
+    return get_client().admin.command("ping")
+
+
+# --------------------------
+# LAZY HANDLES
+# --------------------------
+
+# Modules keep `foods = db["foods"]` at import time; these proxies resolve against the
+# current process's client on every use, so importing never connects.
+class LazyCollection:
+    def __init__(self, name):
+        self._name = name
+        self._cached = (None, None)
+
+    def _collection(self):
+        client = get_client()
+        owner, collection = self._cached
+        if owner is not client:
+            collection = client[MONGO_DB_NAME][self._name]
+            self._cached = (client, collection)
+        return collection
+
+    @property
+    def name(self):
+        return self._name
+
+    def __getattr__(self, attr):
+        return getattr(self._collection(), attr)
+
+    def __repr__(self):
+        return f"LazyCollection({MONGO_DB_NAME}.{self._name})"
+
+
+class LazyDatabase:
+    def __getitem__(self, name):
+        return LazyCollection(name)
+
+    def __getattr__(self, attr):
+        return getattr(get_db(), attr)
+
+    def __repr__(self):
+        return f"LazyDatabase({MONGO_DB_NAME})"
+
+
+class LazyClient:
+    def __getitem__(self, name):
+        return get_client()[name]
+
+    def __getattr__(self, attr):
+        return getattr(get_client(), attr)
+
+    def __repr__(self):
+        return "LazyClient()"
+
+
+client = LazyClient()
+db = LazyDatabase()
@@ -0,0 +1,121 @@
+from datetime import datetime, timezone
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+# ✅ Every index the app relies on, keyed by collection. Names are left to Mongo's
+# defaults so re-running against an existing deployment is a no-op.
+INDEXES = {
+    "foods": [
+        IndexModel([("user_id", ASCENDING), ("timestamp", ASCENDING)]),
+    ],
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True),
+    ],
+    "daily_totals": [
+        IndexModel([("user_id", ASCENDING), ("date", ASCENDING)], unique=True),
+    ],
+    "nutrient_cache": [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "sessions": [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "jobs": [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "dashboard_cache": [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "upc_cache": [
+        IndexModel([("upc", ASCENDING)], unique=True),
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "image_recognitions": [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "live_events": [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "notifications": [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "upstream_quota": [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+}
+
+# ✅ Queries on request hot paths; none of them may be answered by a collection scan
+HOT_QUERIES = [
+    ("dashboard meals today", "foods",
+     lambda now: {"user_id": "000000000000000000000000", "timestamp": {"$gte": now, "$lt": now}}),
+    ("login by email", "users", lambda now: {"email": "someone@example.com"}),
+    ("daily totals", "daily_totals", lambda now: {"user_id": "000000000000000000000000", "date": "2024-01-01"}),
+    ("barcode cache", "upc_cache", lambda now: {"upc": "012345678905", "expires_at": {"$gt": now}}),
+    ("session lookup", "sessions", lambda now: {"_id": "sample-session-id", "expires_at": {"$gt": now}}),
+    ("nutrient cache", "nutrient_cache", lambda now: {"_id": "2 rotis", "expires_at": {"$gt": now}}),
+    ("evening notification", "notifications", lambda now: {"_id": "000000000000000000000000:2024-01-01"}),
+]
+
+# A couple of documents per collection so the planner has something to choose between
+_SAMPLE_DOCS = {
+    "foods": lambda now: [{"user_id": f"{i:024x}", "food_name": "sample", "calories": 1, "timestamp": now}
+                          for i in range(2)],
+    "users": lambda now: [{"email": f"sample{i}@example.com"} for i in range(2)],
+    "daily_totals": lambda now: [{"user_id": f"{i:024x}", "date": "2024-01-01", "calories": 1} for i in range(2)],
+    "upc_cache": lambda now: [{"upc": f"{i:012d}", "foods": [], "expires_at": now} for i in range(2)],
+    "nutrient_cache": lambda now: [{"_id": f"sample {i}", "foods": [], "expires_at": now} for i in range(2)],
+    "sessions": lambda now: [{"_id": f"sample-{i}", "data": "{}", "expires_at": now} for i in range(2)],
+}
+
+
+def ensure_indexes(database):
+    created, errors = {}, {}
+    for name, models in INDEXES.items():
+        try:
+            created[name] = database[name].create_indexes(models)
+        except OperationFailure as e:
+            errors[name] = str(e)
+    return created, errors
+
+
+def _plan_stages(plan):
+    stages = [plan.get("stage")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages += _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return stages
+
+
+def explain_hot_queries(database):
+    now = datetime.now(timezone.utc)
+    results = []
+    for label, collection, build_filter in HOT_QUERIES:
+        explain = database[collection].find(build_filter(now)).explain()
+        winning = explain.get("queryPlanner", {}).get("winningPlan", {})
+        stages = [s for s in _plan_stages(winning) if s]
+        results.append({
+            "query": label,
+            "collection": collection,
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages,
+        })
+    return results
+
+
+# ✅ Builds a throwaway database with the registry applied and some sample rows, then explains
+def check_query_plans_scratch(client, name="calorie_tracker_plan_check"):
+    client.drop_database(name)
+    database = client[name]
+    try:
+        now = datetime.now(timezone.utc)
+        for collection, make_docs in _SAMPLE_DOCS.items():
+            database[collection].insert_many(make_docs(now))
+        _, errors = ensure_indexes(database)
+        if errors:
+            raise RuntimeError(f"Index creation failed: {errors}")
+        return explain_hot_queries(database)
+    finally:
+        client.drop_database(name)
@@ -0,0 +1,38 @@
+from pymongo import monitoring
+
+from services.metrics import Counter, Histogram
+
+MONGO_COMMAND_LATENCY = Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command round trips, by collection and command.",
+    ("collection", "command")
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "mongodb_command_failures", "MongoDB commands that returned an error.",
+    ("collection", "command")
+)
+
+
+def _collection(event):
+    if event.command_name == "getMore":
+        return event.command.get("collection", "")
+    target = event.command.get(event.command_name)
+    return target if isinstance(target, str) else ""
+
+
+# ✅ pymongo command monitoring: the started event is the only one carrying the command,
+# so the collection is parked by (connection, request id) until the reply comes back
+class CommandTimer(monitoring.CommandListener):
+    def __init__(self):
+        self._pending = {}
+
+    def started(self, event):
+        self._pending[(event.connection_id, event.request_id)] = _collection(event)
+
+    def succeeded(self, event):
+        collection = self._pending.pop((event.connection_id, event.request_id), "")
+        MONGO_COMMAND_LATENCY.observe(event.duration_micros / 1e6, collection, event.command_name)
+
+    def failed(self, event):
+        collection = self._pending.pop((event.connection_id, event.request_id), "")
+        MONGO_COMMAND_LATENCY.observe(event.duration_micros / 1e6, collection, event.command_name)
+        MONGO_COMMAND_FAILURES.inc(collection, event.command_name)
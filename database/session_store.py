@@ -0,0 +1,109 @@
+import secrets
+from datetime import datetime, timezone
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+from services.cache import TTLCache
+from services.logs import get_logger
+
+logger = get_logger(__name__)
+
+
+class MongoSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, new=False, expires_at=None):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.expires_at = expires_at
+        self.modified = False
+
+
+# ✅ Server-side sessions in a Mongo collection (TTL index on expires_at). The cookie only
+# carries a random session id; the document is written back only when the session changed
+# or is close to expiring, so most requests cost one indexed read (or none with the cache).
+class MongoSessionInterface(SessionInterface):
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, collection, cache_size=0, cache_ttl=30):
+        self.collection = collection
+        # Off by default: with several workers a logout only evicts the local copy, so
+        # another worker may keep serving the old session for up to cache_ttl seconds
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl) if cache_size else None
+
+    def _lifetime(self, app):
+        return app.permanent_session_lifetime
+
+    def _load(self, sid):
+        if self.cache is not None:
+            cached = self.cache.get(sid)
+            if cached is not None:
+                return cached
+
+        doc = self.collection.find_one({"_id": sid, "expires_at": {"$gt": datetime.now(timezone.utc)}})
+        if doc is None:
+            return None
+        entry = (self.serializer.loads(doc["data"]), doc["expires_at"].replace(tzinfo=timezone.utc))
+        if self.cache is not None:
+            self.cache.set(sid, entry)
+        return entry
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            try:
+                entry = self._load(sid)
+            except Exception as e:
+                logger.error("Session load error", error=str(e))
+                entry = None
+            if entry is not None:
+                data, expires_at = entry
+                return MongoSession(data, sid=sid, expires_at=expires_at)
+        return MongoSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def _needs_refresh(self, app, session):
+        # Rolling expiry without a write per request: extend once half the lifetime is gone
+        if session.expires_at is None:
+            return False
+        return session.expires_at - datetime.now(timezone.utc) < self._lifetime(app) / 2
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if not session:
+            if session.modified and not session.new:
+                self.collection.delete_one({"_id": session.sid})
+                if self.cache is not None:
+                    self.cache.pop(session.sid)
+                response.delete_cookie(name, domain=domain, path=path, secure=secure,
+                                       samesite=samesite, httponly=httponly)
+            return
+
+        refresh = self._needs_refresh(app, session)
+        if session.modified or refresh:
+            expires_at = datetime.now(timezone.utc) + self._lifetime(app)
+            self.collection.replace_one(
+                {"_id": session.sid},
+                {"data": self.serializer.dumps(dict(session)), "expires_at": expires_at},
+                upsert=True
+            )
+            session.expires_at = expires_at
+            if self.cache is not None:
+                self.cache.set(session.sid, (dict(session), expires_at))
+
+        if session.modified or refresh or self.should_set_cookie(app, session):
+            response.set_cookie(
+                name, session.sid,
+                expires=self.get_expiration_time(app, session),
+                domain=domain, path=path, secure=secure,
+                samesite=samesite, httponly=httponly
+            )
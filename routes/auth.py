@@ -1,6 +1,11 @@
 from flask import Blueprint, request, session, redirect, jsonify, render_template
+from pymongo.errors import DuplicateKeyError
 from database.db import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from services.passwords import hash_pool, HashPoolBusy
+from services.timezones import DEFAULT_TZ, is_valid_timezone
+from services.logs import get_logger
+
+logger = get_logger(__name__)
 
 auth_bp = Blueprint("auth", __name__)
 users = db["users"]
@@ -16,7 +21,6 @@ def signup_page():
 @auth_bp.route("/signup", methods=["POST"])
 def signup():
     data = request.form
-    print("Signup FORM data:", data)
 
     name = data.get("name")
     email = data.get("email")
@@ -30,18 +34,33 @@ def signup():
     if existing_user:
         return jsonify({"error": "User already exists"}), 400
 
+    # Hashing runs on the bounded hash pool, not on the request thread
+    try:
+        password_hash = hash_pool.hash(password)
+    except HashPoolBusy:
+        return jsonify({"error": "Too many requests, try again shortly"}), 503, {"Retry-After": "2"}
+
+    # The signup form fills this from the browser (Intl.DateTimeFormat().resolvedOptions().timeZone)
+    tz_name = data.get("timezone", "").strip()
+
     # Insert new user
     new_user = {
         "name": name,
         "email": email,
-        "password": generate_password_hash(password),
+        "password": password_hash,
         "age": data.get("age", ""),
         "height": data.get("height", ""),
         "weight": data.get("weight", ""),
-        "goal_calories": int(data.get("goal_calories", 2000))
+        "goal_calories": int(data.get("goal_calories", 2000)),
+        "timezone": tz_name if is_valid_timezone(tz_name) else DEFAULT_TZ
     }
 
-    users.insert_one(new_user)
+    # The unique email index settles concurrent signups that both passed the check above
+    try:
+        result = users.insert_one(new_user)
+    except DuplicateKeyError:
+        return jsonify({"error": "User already exists"}), 400
+    logger.info("User signed up", new_user_id=str(result.inserted_id))
     return redirect("/auth/login")
 
 
@@ -56,7 +75,6 @@ def login_page():
 @auth_bp.route("/login", methods=["POST"])
 def login():
     data = request.form
-    print("Login FORM data:", data)
 
     email = data.get("email")
     password = data.get("password")
@@ -65,10 +83,28 @@ def login():
         return jsonify({"error": "Missing email or password"}), 400
 
     user = users.find_one({"email": email})
-    if not user or not check_password_hash(user["password"], password):
+    if not user:
+        logger.info("Login failed", reason="unknown_email")
+        return jsonify({"error": "Invalid credentials"}), 401
+
+    try:
+        ok, new_hash = hash_pool.verify(user["password"], password)
+    except HashPoolBusy:
+        logger.warning("Login rejected, hash pool busy")
+        return jsonify({"error": "Too many logins in progress, try again shortly"}), 503, {"Retry-After": "2"}
+    if not ok:
+        logger.info("Login failed", reason="bad_password", login_user_id=str(user["_id"]))
         return jsonify({"error": "Invalid credentials"}), 401
 
+    # ✅ Hashes made with an older method/cost are upgraded while we have the plain password
+    if new_hash:
+        try:
+            users.update_one({"_id": user["_id"], "password": user["password"]}, {"$set": {"password": new_hash}})
+        except Exception as e:
+            logger.error("Password rehash error", error=str(e))
+
     session["user_id"] = str(user["_id"])
+    logger.info("Login succeeded", login_user_id=str(user["_id"]), rehashed=bool(new_hash))
     return render_template("/dashboard.html")
 
 
@@ -101,5 +137,5 @@ def forgot_password():
         return jsonify({"error": "Email not registered"}), 404
 
     # Simulate sending email
-    print(f"Password reset email would be sent to {email}")
+    logger.info("Password reset requested", reset_user_id=str(user["_id"]))
     return jsonify({"message": "Reset instructions sent to email."})
@@ -1,14 +1,67 @@
-from flask import Blueprint, session, jsonify, render_template, redirect
+from flask import Blueprint, session, jsonify, render_template, redirect, request
 from database.db import db
 from bson.objectid import ObjectId
-from datetime import datetime, timedelta
-import pytz
+from services.meals import get_daily_totals
+from services import dashboard_cache, notifications
+from services.timezones import local_now, to_local, today_bounds, user_timezone
+from services.logs import get_logger
+
+logger = get_logger(__name__)
 
 # Blueprint setup
 dashboard_bp = Blueprint("dashboard", __name__)
 foods = db["foods"]
 users = db["users"]
 
+# Meals beyond this are still counted in the totals, just not listed
+MEAL_LIST_LIMIT = 50
+
+# ✅ Totals, the projected meal list and the user's goal in one round trip
+def get_today_stats(user_id, start, end):
+    pipeline = [
+        {"$match": {
+            "user_id": user_id,  # Stored as string in DB
+            "timestamp": {"$gte": start, "$lt": end}
+        }},
+        {"$facet": {
+            "totals": [
+                {"$group": {"_id": None, "consumed": {"$sum": "$calories"}}}
+            ],
+            "meals": [
+                {"$sort": {"timestamp": 1}},
+                {"$limit": MEAL_LIST_LIMIT},
+                {"$project": {
+                    "_id": {"$toString": "$_id"},
+                    "food_name": {"$ifNull": ["$food_name", "Unnamed"]},
+                    "calories": {"$ifNull": ["$calories", 0]},
+                    "timestamp": 1,
+                    "meal_type": {"$ifNull": ["$meal_type", "Meal"]}
+                }}
+            ]
+        }}
+    ]
+
+    try:
+        pipeline.append({"$lookup": {
+            "from": "users",
+            "pipeline": [
+                {"$match": {"_id": ObjectId(user_id)}},
+                {"$project": {"_id": 0, "goal_calories": 1}}
+            ],
+            "as": "user"
+        }})
+    except Exception as e:
+        logger.error("Invalid user id", error=str(e))
+
+    result = next(foods.aggregate(pipeline), {})
+    totals = result.get("totals") or [{}]
+    user = (result.get("user") or [{}])[0]
+    return {
+        "goal": float(user.get("goal_calories", 2000)),
+        "consumed": totals[0].get("consumed", 0),
+        "meals": result.get("meals", [])
+    }
+
 # ✅ API Endpoint: Dashboard JSON Data
 @dashboard_bp.route("/api/dashboard")
 def get_dashboard_data():
@@ -17,93 +70,91 @@ def get_dashboard_data():
 
     user_id = str(session["user_id"])
 
-    # Set timezone to IST
-    tz = pytz.timezone("Asia/Kolkata")
-    now = datetime.now(tz)
-    start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    end = start + timedelta(days=1)
-
-    # Fetch user goal or fallback to default
-    try:
-        user = users.find_one({"_id": ObjectId(user_id)})
-        goal = float(user.get("goal_calories", 2000)) if user else 2000
-    except Exception as e:
-        print("❌ User fetch error:", e)
-        goal = 2000
+    # "Today" is the user's local day; start/end are cached UTC boundaries
+    tz_name = user_timezone(user_id)
+    today, start, end = today_bounds(tz_name)
+    day = today.isoformat()
+
+    # Serve the cached payload until a write invalidates it; unchanged clients get a 304
+    cached = dashboard_cache.get_cached(user_id, day)
+    if cached:
+        payload, etag = cached
+    else:
+        generation = dashboard_cache.generation(user_id)
+        try:
+            stats = get_today_stats(user_id, start, end)
+        except Exception as e:
+            logger.exception("Dashboard stats error")
+            stats = None
+
+        payload = build_dashboard_payload(stats or {"goal": 2000, "consumed": 0, "meals": []}, tz_name)
+        if stats is None:
+            etag = dashboard_cache.make_etag(payload)  # don't cache the fallback
+        else:
+            etag = dashboard_cache.store(user_id, day, payload, generation)
 
-    # Get meals logged today
-    try:
-        meals_today = list(foods.find({
-            "user_id": user_id,  # Stored as string in DB
-            "timestamp": {"$gte": start, "$lt": end}
-        }))
-    except Exception as e:
-        print("❌ Meals fetch error:", e)
-        meals_today = []
+    response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response.make_conditional(request)
 
-    # Calculate stats
-    consumed = sum(m.get("calories", 0) for m in meals_today)
+def build_dashboard_payload(stats, tz_name):
+    goal = stats["goal"]
+    consumed = stats["consumed"]
     remaining = max(0, goal - consumed)
     progress = round((consumed / goal) * 100, 1) if goal > 0 else 0
 
-    # Format meals for frontend
-    formatted_meals = [
-        {
-            "_id": str(m["_id"]),
-            "food_name": m.get("food_name", "Unnamed"),
-            "calories": m.get("calories", 0),
-            "timestamp": m.get("timestamp").isoformat() if m.get("timestamp") else "",
-            "meal_type": m.get("meal_type", "Meal")
-        }
-        for m in meals_today
-    ]
+    # Format meals for frontend (local time with offset)
+    for m in stats["meals"]:
+        m["timestamp"] = to_local(m["timestamp"], tz_name).isoformat() if m.get("timestamp") else ""
 
-    return jsonify({
+    return {
         "goal": goal,
         "consumed": consumed,
         "remaining": remaining,
         "progress": progress,
-        "meals": formatted_meals
-    })
-
-# ✅ Generate Zomato-Style Notification (after 8PM only)
-def get_daily_notification(consumed, goal):
-    tz = pytz.timezone("Asia/Kolkata")
-    now = datetime.now(tz)
-    if now.hour >= 20:  # After 8PM
-        if consumed >= goal:
-            return f"🎉 Awesome! You hit your goal of {goal} calories today!"
-        else:
-            return f"🌟 You’ve consumed {consumed} of {goal} cal. Keep going, you’ve got this!"
-    return None
+        "meals": stats["meals"]
+    }
 
-# ✅ Render Dashboard Page with notification
-@dashboard_bp.route("/dashboard")
-def dashboard_page():
-    if "user_id" not in session:
-        return redirect("/auth/login")
+# ✅ Zomato-Style Notification (after 8PM in the user's timezone only). Normally precomputed
+# by `flask notifications compute`; a meal write since then means one lazy recompute here.
+def get_daily_notification(user_id, tz_name):
+    now = local_now(tz_name)
+    if now.hour < notifications.NOTIFICATION_HOUR:
+        return None
 
-    user_id = str(session["user_id"])
-    tz = pytz.timezone("Asia/Kolkata")
-    now = datetime.now(tz)
-    start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    end = start + timedelta(days=1)
+    day = now.strftime("%Y-%m-%d")
+    try:
+        doc = notifications.get_notification(user_id, day)
+        if doc:
+            return doc["message"]
+    except Exception as e:
+        logger.error("Notification read error", error=str(e))
 
     try:
-        user = users.find_one({"_id": ObjectId(user_id)})
+        user = users.find_one({"_id": ObjectId(user_id)}, {"goal_calories": 1})
         goal = float(user.get("goal_calories", 2000)) if user else 2000
     except:
         goal = 2000
 
     try:
-        meals_today = list(foods.find({
-            "user_id": user_id,
-            "timestamp": {"$gte": start, "$lt": end}
-        }))
+        consumed = get_daily_totals(user_id, day)["calories"]
     except:
-        meals_today = []
+        consumed = 0
 
-    consumed = sum(m.get("calories", 0) for m in meals_today)
-    notification = get_daily_notification(consumed, goal)
+    try:
+        return notifications.store_notification(user_id, day, consumed, goal)["message"]
+    except Exception as e:
+        logger.error("Notification write error", error=str(e))
+        return notifications.build_message(consumed, goal)
+
+# ✅ Render Dashboard Page with notification
+@dashboard_bp.route("/dashboard")
+def dashboard_page():
+    if "user_id" not in session:
+        return redirect("/auth/login")
+
+    user_id = str(session["user_id"])
+    notification = get_daily_notification(user_id, user_timezone(user_id))
 
     return render_template("dashboard.html", notification=notification)
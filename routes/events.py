@@ -0,0 +1,62 @@
+import json
+import os
+import threading
+import time
+from flask import Blueprint, Response, jsonify, session, stream_with_context
+from services import events
+from services.logs import get_logger
+
+logger = get_logger(__name__)
+
+# Blueprint setup
+events_bp = Blueprint("events", __name__)
+
+# Each open stream holds a worker thread, so run with gthread/gevent workers and cap them
+MAX_STREAMS = int(os.getenv("LIVE_EVENTS_MAX_STREAMS", 200))
+HEARTBEAT_SECONDS = float(os.getenv("LIVE_EVENTS_HEARTBEAT", 15))
+# Streams are recycled now and then; EventSource reconnects on its own
+MAX_STREAM_SECONDS = float(os.getenv("LIVE_EVENTS_MAX_SECONDS", 600))
+RETRY_MS = 3000
+
+_open_streams = threading.BoundedSemaphore(MAX_STREAMS)
+
+
+def format_event(event):
+    lines = [f"id: {event['id']}"] if "id" in event else []
+    lines.append(f"event: {event['type']}")
+    lines.append(f"data: {json.dumps(event, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+# ✅ API Endpoint: GET /api/events (text/event-stream). Pushes meal_added / meal_deleted deltas
+# for the signed-in user; "resync" means refetch /api/dashboard once.
+@events_bp.route("/events")
+def event_stream():
+    if "user_id" not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+    if not _open_streams.acquire(blocking=False):
+        return jsonify({"error": "Too many live connections, fall back to polling"}), 503, {"Retry-After": "30"}
+
+    subscription = events.subscribe(session["user_id"])
+
+    def generate():
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            yield format_event({"type": "ready"})
+            deadline = time.monotonic() + MAX_STREAM_SECONDS
+            while time.monotonic() < deadline:
+                event = subscription.get(timeout=HEARTBEAT_SECONDS)
+                if subscription.overflowed:
+                    yield format_event({"type": "resync"})
+                    return
+                # A comment line keeps proxies from closing an idle connection
+                yield format_event(event) if event is not None else ": keep-alive\n\n"
+        finally:
+            events.unsubscribe(subscription)
+            _open_streams.release()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,40 @@
+from flask import Blueprint, session, jsonify, request, Response, stream_with_context
+from datetime import datetime, timezone
+from services.export import FORMATS, export_cursor, stream_export
+
+# Blueprint setup
+export_bp = Blueprint("export", __name__)
+
+# ✅ API Endpoint: /api/export?format=csv|ndjson&gzip=1 (streams the whole food log)
+@export_bp.route("/export")
+def export_foods():
+    if "user_id" not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    fmt = request.args.get("format", "csv").lower()
+    if fmt not in FORMATS:
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+    gzip = request.args.get("gzip", "").lower() in ("1", "true", "yes")
+
+    user_id = str(session["user_id"])
+    _, mimetype, extension = FORMATS[fmt]
+    filename = f"food-log-{datetime.now(timezone.utc).strftime('%Y%m%d')}.{extension}"
+    if gzip:
+        mimetype, filename = "application/gzip", filename + ".gz"
+
+    def generate():
+        cursor = export_cursor(user_id)
+        try:
+            yield from stream_export(cursor, fmt, gzip)
+        finally:
+            cursor.close()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store",
+            "X-Accel-Buffering": "no"
+        }
+    )
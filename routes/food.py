@@ -1,30 +1,23 @@
 # routes/food.py
 
 from flask import Blueprint, request, session, jsonify, redirect, render_template
-from database.db import db
-import requests
-import os
-from datetime import datetime
 from bson.objectid import ObjectId
 from bson.errors import InvalidId
-import pytz
-from werkzeug.utils import secure_filename
-import uuid
-
-# Blueprint & Collections
+from services.nutrients import lookup_nutrients, NutritionixError, QuotaExceeded
+from services.quota import retry_after_header
+from services.upc_cache import lookup_upc
+from services.meals import save_meal, delete_meal, log_items
+from services.timezones import utc_now
+from services.image_jobs import image_jobs, log_image
+from services.jobs import QueueFull
+from services.uploads import read_upload, limit_upload_size, UploadTooLarge
+
+# Blueprint setup
 food_bp = Blueprint("food", __name__, url_prefix="/food")
-foods = db["foods"]
-users = db["users"]
-
-# Nutritionix Setup
-NUTRITIONIX_API_KEY = os.getenv("NUTRITIONIX_API_KEY")
-NUTRITIONIX_APP_ID = os.getenv("NUTRITIONIX_APP_ID")
 
-headers = {
-    "x-app-id": NUTRITIONIX_APP_ID,
-    "x-app-key": NUTRITIONIX_API_KEY,
-    "Content-Type": "application/json"
-}
+MAX_BULK_ITEMS = 50
+MAX_JOB_WAIT = 25
+QUOTA_MESSAGE = "Too many food lookups right now, try again shortly"
 
 # ✅ Voice/Natural Language Logging
 @food_bp.route("/log", methods=["POST"])
@@ -37,12 +30,17 @@ def log_food():
     if not query:
         return jsonify({"error": "Query required"}), 400
 
-    res = requests.post("https://trackapi.nutritionix.com/v2/natural/nutrients", headers=headers, json={"query": query})
-    if res.status_code != 200:
+    try:
+        foods_list = lookup_nutrients(query)
+    except QuotaExceeded as e:
+        return quota_exceeded(e)
+    except NutritionixError:
+        return jsonify({"error": "Failed to fetch food data"}), 400
+    if not foods_list:
         return jsonify({"error": "Failed to fetch food data"}), 400
 
-    food_data = res.json()["foods"][0]
-    now = datetime.now(pytz.timezone("Asia/Kolkata"))
+    food_data = foods_list[0]
+    now = utc_now()
 
     log = {
         "user_id": str(session["user_id"]),
@@ -55,10 +53,47 @@ def log_food():
         "timestamp": now
     }
 
-    result = foods.insert_one(log)
-    log["_id"] = str(result.inserted_id)
+    log["_id"] = str(save_meal(log))
     return jsonify({"message": "Food logged successfully", "log": log}), 201
 
+# ✅ Bulk Logging: {"queries": [...]} or {"items": [{"query", "meal_type"}, ...]}
+@food_bp.route("/log/bulk", methods=["POST"])
+def log_food_bulk():
+    if "user_id" not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    data = request.get_json(silent=True) or {}
+    default_meal_type = data.get("meal_type", "Meal")
+    queries = data.get("queries") or []
+    if not isinstance(queries, list) or not all(isinstance(q, str) for q in queries):
+        return jsonify({"error": "queries must be a list of strings"}), 400
+    raw_items = data.get("items") or [{"query": q} for q in queries]
+    if not isinstance(raw_items, list) or not raw_items:
+        return jsonify({"error": "items or queries required"}), 400
+    if len(raw_items) > MAX_BULK_ITEMS:
+        return jsonify({"error": f"At most {MAX_BULK_ITEMS} items per request"}), 400
+
+    items = []
+    for raw in raw_items:
+        query = raw.get("query") if isinstance(raw, dict) else None
+        if not isinstance(query, str) or not query.strip():
+            return jsonify({"error": "Every item needs a query"}), 400
+        items.append({"query": query.strip(), "meal_type": raw.get("meal_type", default_meal_type)})
+
+    now = utc_now()
+    results = log_items(str(session["user_id"]), items, now)
+
+    logged = sum(1 for r in results if r["status"] == "logged")
+    throttled = [r["retry_after"] for r in results if "retry_after" in r]
+    if throttled and not logged:
+        return jsonify({"error": QUOTA_MESSAGE, "results": results}), 429, retry_after_header(min(throttled))
+    return jsonify({
+        "message": f"Logged {logged} of {len(results)} items",
+        "logged": logged,
+        "failed": len(results) - logged,
+        "results": results
+    }), 201 if logged else 400
+
 # ✅ Delete food
 @food_bp.route("/delete/<string:food_id>", methods=["DELETE"])
 def delete_food(food_id):
@@ -69,12 +104,8 @@ def delete_food(food_id):
     except InvalidId:
         return jsonify({"error": "Invalid food ID"}), 400
 
-    result = foods.delete_one({
-        "_id": obj_id,
-        "user_id": str(session["user_id"])
-    })
-
-    if result.deleted_count == 0:
+    deleted = delete_meal(obj_id, str(session["user_id"]))
+    if deleted is None:
         return jsonify({"error": "Food not found"}), 404
 
     return jsonify({"message": "Food deleted successfully"}), 200
@@ -90,11 +121,13 @@ def barcode_search():
     if not code:
         return jsonify({"error": "Barcode is required"}), 400
 
-    res = requests.get(f"https://trackapi.nutritionix.com/v2/search/item?upc={code}", headers=headers)
-    if res.status_code != 200:
+    try:
+        item = lookup_upc(code)
+    except QuotaExceeded as e:
+        return quota_exceeded(e)
+    except NutritionixError:
         return jsonify({"error": "Failed to fetch item"}), 400
 
-    item = res.json().get("foods", [])
     if not item:
         return jsonify({"error": "Item not found"}), 404
 
@@ -113,11 +146,16 @@ def manual_input():
         if not query:
             return "Food input required", 400
 
-        res = requests.post("https://trackapi.nutritionix.com/v2/natural/nutrients", headers=headers, json={"query": query})
-        if res.status_code != 200:
+        try:
+            foods_list = lookup_nutrients(query)
+        except QuotaExceeded as e:
+            return QUOTA_MESSAGE, 429, retry_after_header(e.retry_after)
+        except NutritionixError:
+            return "Failed to fetch food data", 400
+        if not foods_list:
             return "Failed to fetch food data", 400
 
-        food_data = res.json()["foods"][0]
+        food_data = foods_list[0]
 
         log = {
             "user_id": str(session["user_id"]),
@@ -127,10 +165,10 @@ def manual_input():
             "protein": food_data.get("nf_protein", 0),
             "carbs": food_data.get("nf_total_carbohydrate", 0),
             "fat": food_data.get("nf_total_fat", 0),
-            "timestamp": datetime.now(pytz.timezone("Asia/Kolkata"))
+            "timestamp": utc_now()
         }
 
-        foods.insert_one(log)
+        save_meal(log)
         return redirect("/dashboard")
 
     return render_template("manual_input.html")
@@ -142,6 +180,7 @@ def image_input():
         return redirect("/auth/login")
 
     if request.method == "POST":
+        limit_upload_size()
         if "food_image" not in request.files:
             return render_template("image_input.html", error="No image uploaded")
 
@@ -149,34 +188,59 @@ def image_input():
         if image.filename == "":
             return render_template("image_input.html", error="No selected image")
 
-        filename = secure_filename(image.filename)
-        unique_name = f"{uuid.uuid4().hex}_{filename}"
-        filepath = os.path.join("temp_uploads", unique_name)
-        os.makedirs("temp_uploads", exist_ok=True)
-        image.save(filepath)
-
-        # 🚧 Simulate recognition (later integrate real model)
-        recognized_food = "apple"
-
-        # Get nutrition info
-        res = requests.post("https://trackapi.nutritionix.com/v2/natural/nutrients", headers=headers, json={"query": recognized_food})
-        if res.status_code != 200:
-            return render_template("image_input.html", error="Failed to get nutrition info")
+        try:
+            image_bytes, digest = read_upload(image)
+        except UploadTooLarge as e:
+            if wants_json():
+                return jsonify({"error": str(e)}), 413
+            return render_template("image_input.html", error=str(e)), 413
+
+        # A photo we've seen before is logged straight away; new ones go to the image job pool
+        try:
+            outcome = log_image(str(session["user_id"]), image_bytes, digest)
+        except QueueFull:
+            if wants_json():
+                return jsonify({"error": "Too many images are being processed, try again shortly"}), 503, {"Retry-After": "5"}
+            return render_template("image_input.html", error="Too many images are being processed, try again shortly"), 503
+
+        if outcome["status"] == "done":
+            if wants_json():
+                return jsonify(dict(outcome["result"], status="done")), 201
+            return render_template("image_input.html", message=outcome["result"]["message"])
+
+        job_id = outcome["job_id"]
+        status_url = f"/food/jobs/{job_id}"
+        if wants_json():
+            return jsonify({"job_id": job_id, "status": "queued", "status_url": status_url}), 202
+        return render_template("image_input.html", message="Your photo is being processed…", job_id=job_id, status_url=status_url)
 
-        food_data = res.json()["foods"][0]
-        log = {
-            "user_id": str(session["user_id"]),
-            "food_name": food_data["food_name"],
-            "meal_type": "Image",
-            "calories": food_data.get("nf_calories", 0),
-            "protein": food_data.get("nf_protein", 0),
-            "carbs": food_data.get("nf_total_carbohydrate", 0),
-            "fat": food_data.get("nf_total_fat", 0),
-            "timestamp": datetime.now(pytz.timezone("Asia/Kolkata"))
-        }
+    return render_template("image_input.html")
 
-        foods.insert_one(log)
-        os.remove(filepath)  # ✅ Clean up temp image
-        return render_template("image_input.html", message=f"Food logged: {food_data['food_name']} ({food_data['nf_calories']} kcal)")
+# ✅ Job status: GET /food/jobs/<id>?wait=10 long-polls until the job finishes
+@food_bp.route("/jobs/<string:job_id>", methods=["GET"])
+def job_status(job_id):
+    if "user_id" not in session:
+        return jsonify({"error": "Unauthorized"}), 401
 
-    return render_template("image_input.html")
+    try:
+        wait = min(max(float(request.args.get("wait", 0)), 0), MAX_JOB_WAIT)
+    except ValueError:
+        return jsonify({"error": "wait must be a number of seconds"}), 400
+
+    job = image_jobs.wait(job_id, wait) if wait else image_jobs.get(job_id)
+    if not job or job.get("owner") != str(session["user_id"]):
+        return jsonify({"error": "Job not found"}), 404
+
+    return jsonify({
+        "job_id": job["_id"],
+        "status": job["status"],
+        "result": job.get("result"),
+        "error": job.get("error")
+    }), 200
+
+# ✅ 429 with Retry-After when the user's (or the app's) Nutritionix quota is spent
+def quota_exceeded(e):
+    return jsonify({"error": QUOTA_MESSAGE, "scope": e.scope}), 429, retry_after_header(e.retry_after)
+
+def wants_json():
+    return request.accept_mimetypes.best_match(["text/html", "application/json"]) == "application/json"
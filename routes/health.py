@@ -0,0 +1,33 @@
+import os
+import time
+from flask import Blueprint, jsonify
+from database.db import ping, MONGO_OPTIONS
+from services.logs import get_logger
+
+logger = get_logger(__name__)
+
+# Blueprint setup
+health_bp = Blueprint("health", __name__)
+
+# ✅ Liveness: the worker is up and serving; never touches MongoDB
+@health_bp.route("/healthz")
+def healthz():
+    return jsonify({"status": "ok", "pid": os.getpid()})
+
+# ✅ Readiness: this worker can reach MongoDB (bounded by MONGO_SERVER_SELECTION_TIMEOUT_MS)
+@health_bp.route("/readyz")
+def readyz():
+    started = time.perf_counter()
+    try:
+        ping()
+    except Exception as e:
+        logger.warning("Readiness check failed", error=str(e))
+        return jsonify({"status": "unavailable", "mongo": "unreachable", "pid": os.getpid()}), 503
+
+    return jsonify({
+        "status": "ok",
+        "mongo": "ok",
+        "mongo_ping_ms": round((time.perf_counter() - started) * 1000, 2),
+        "mongo_max_pool_size": MONGO_OPTIONS["maxPoolSize"],
+        "pid": os.getpid()
+    })
@@ -0,0 +1,129 @@
+from flask import Blueprint, session, jsonify, request
+from database.db import db
+from datetime import datetime, timedelta
+from services.timezones import local_midnight, local_now, user_timezone
+from services.logs import get_logger
+
+logger = get_logger(__name__)
+
+# Blueprint setup
+history_bp = Blueprint("history", __name__)
+foods = db["foods"]
+
+DEFAULT_LIMIT = {"day": 31, "week": 12, "month": 12}
+MAX_LIMIT = 366
+
+# $dateToString formats for each bucket size
+PERIOD_FORMATS = {"day": "%Y-%m-%d", "week": "%G-W%V", "month": "%Y-%m"}
+TOTAL_FIELDS = ("calories", "protein", "carbs", "fat")
+
+
+def period_start(day, granularity):
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def next_period(day, granularity):
+    if granularity == "week":
+        return day + timedelta(days=7)
+    if granularity == "month":
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def period_key(day, granularity):
+    if granularity == "week":
+        year, week, _ = day.isocalendar()
+        return f"{year}-W{week:02d}"
+    return day.strftime(PERIOD_FORMATS[granularity])
+
+
+def parse_day(value, default):
+    if not value:
+        return default
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+# ✅ Totals per day/week/month for one page of periods. The page is a time window, so each
+# request reads only its own slice of the (user_id, timestamp) index.
+def get_history_page(user_id, first, last, granularity, limit, tz_name):
+    periods = []
+    cursor = period_start(first, granularity)
+    while cursor <= last and len(periods) < limit:
+        periods.append(cursor)
+        cursor = next_period(cursor, granularity)
+    next_cursor = cursor if cursor <= last else None
+
+    window_start = max(periods[0], first)
+    window_end = min(cursor, last + timedelta(days=1))
+
+    group = {"_id": {"$dateToString": {
+        "format": PERIOD_FORMATS[granularity], "date": "$timestamp", "timezone": tz_name
+    }}, "meals": {"$sum": 1}}
+    for field in TOTAL_FIELDS:
+        group[field] = {"$sum": f"${field}"}
+
+    rows = foods.aggregate([
+        {"$match": {
+            "user_id": user_id,
+            "timestamp": {"$gte": local_midnight(tz_name, window_start), "$lt": local_midnight(tz_name, window_end)}
+        }},
+        {"$project": {"_id": 0, "timestamp": 1, "calories": 1, "protein": 1, "carbs": 1, "fat": 1}},
+        {"$group": group}
+    ])
+    totals = {row["_id"]: row for row in rows}
+
+    results = []
+    for start in periods:
+        row = totals.get(period_key(start, granularity), {})
+        entry = {"period": period_key(start, granularity), "start": start.isoformat(), "meals": row.get("meals", 0)}
+        for field in TOTAL_FIELDS:
+            entry[field] = round(row.get(field, 0) or 0, 2)
+        results.append(entry)
+
+    return results, next_cursor
+
+
+# ✅ API Endpoint: /api/history?start=YYYY-MM-DD&end=YYYY-MM-DD&granularity=day|week|month&limit=N&cursor=...
+@history_bp.route("/history")
+def get_history():
+    if "user_id" not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    user_id = str(session["user_id"])
+    granularity = request.args.get("granularity", "day")
+    if granularity not in PERIOD_FORMATS:
+        return jsonify({"error": "granularity must be day, week or month"}), 400
+
+    tz_name = user_timezone(user_id)
+    today = local_now(tz_name).date()
+    try:
+        last = parse_day(request.args.get("end"), today)
+        first = parse_day(request.args.get("start"), last - timedelta(days=29))
+        # The cursor is the first period of the next page
+        first = parse_day(request.args.get("cursor"), first)
+        limit = int(request.args.get("limit", DEFAULT_LIMIT[granularity]))
+    except ValueError:
+        return jsonify({"error": "Dates must be YYYY-MM-DD and limit a number"}), 400
+
+    if first > last:
+        return jsonify({"error": "start must not be after end"}), 400
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    try:
+        periods, next_cursor = get_history_page(user_id, first, last, granularity, limit, tz_name)
+    except Exception as e:
+        logger.exception("History fetch error")
+        return jsonify({"error": "Failed to load history"}), 500
+
+    return jsonify({
+        "granularity": granularity,
+        "timezone": tz_name,
+        "start": first.isoformat(),
+        "end": last.isoformat(),
+        "periods": periods,
+        "next_cursor": next_cursor.isoformat() if next_cursor else None
+    })
@@ -1,31 +1,45 @@
-import os
-# import requests
 from flask import Blueprint, request, jsonify, session
-# from datetime import datetime
-from database.db import db
-from dotenv import load_dotenv
-# import pytz
-# import traceback
+from services.image_jobs import log_image
+from services.jobs import QueueFull
+from services.uploads import read_upload, limit_upload_size, UploadTooLarge
+from services.logs import get_logger
 
-# Load environment variables
-load_dotenv()
+logger = get_logger(__name__)
 
 # Blueprint setup
 image_bp = Blueprint("image", __name__)
-foods = db["foods"]
 
-# API credentials (still loaded if needed later)
-HF_API_TOKEN = os.getenv("HUGGINGFACE_API_TOKEN")
-APP_ID = os.getenv("NUTRITIONIX_APP_ID")
-API_KEY = os.getenv("NUTRITIONIX_API_KEY")
+# Must run before anything touches request.files
+image_bp.before_request(limit_upload_size)
 
-# HF_MODEL_URL = "https://api-inference.huggingface.co/models/hysts/food-classifier"
-
-# 🚫 Image logging feature is disabled temporarily
+# ✅ API Endpoint: multipart upload ("image" or "food_image"), read in memory and hashed.
+# Already-recognized photos are logged right away (201); new ones are queued (202).
 @image_bp.route("/image-log", methods=["POST"])
 def image_log():
-    return jsonify({
-        "error": "Image logging feature is currently disabled."
-    }), 403
+    if "user_id" not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    image = request.files.get("image") or request.files.get("food_image")
+    if image is None or image.filename == "":
+        return jsonify({"error": "No image uploaded"}), 400
+
+    try:
+        image_bytes, digest = read_upload(image)
+    except UploadTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    if not image_bytes:
+        return jsonify({"error": "Uploaded image is empty"}), 400
+
+    try:
+        outcome = log_image(str(session["user_id"]), image_bytes, digest)
+    except QueueFull:
+        return jsonify({"error": "Too many images are being processed, try again shortly"}), 503, {"Retry-After": "5"}
+    except Exception as e:
+        logger.exception("Image log error")
+        return jsonify({"error": "Failed to log image"}), 500
+
+    if outcome["status"] == "done":
+        return jsonify(dict(outcome["result"], status="done")), 201
 
-# ✅ You can re-enable the route by uncommenting the full logic below in future
+    job_id = outcome["job_id"]
+    return jsonify({"job_id": job_id, "status": "queued", "status_url": f"/food/jobs/{job_id}"}), 202
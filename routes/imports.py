@@ -0,0 +1,46 @@
+from flask import Blueprint, session, jsonify, request
+from services.importer import import_meals
+from services.logs import get_logger
+
+logger = get_logger(__name__)
+
+# Blueprint setup
+imports_bp = Blueprint("imports", __name__)
+
+CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+# ✅ API Endpoint: POST /api/import?format=csv|ndjson
+# Send the file as the raw request body (or as a multipart "file" field) — the body
+# is parsed as it arrives and written in chunks, never held in memory all at once.
+@imports_bp.route("/import", methods=["POST"])
+def import_foods():
+    if "user_id" not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    fmt = request.args.get("format") or CONTENT_TYPES.get(request.mimetype)
+    if fmt not in ("csv", "ndjson"):
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+
+    if request.mimetype == "multipart/form-data":
+        upload = request.files.get("file")
+        if upload is None:
+            return jsonify({"error": "No file uploaded"}), 400
+        stream = upload.stream
+    else:
+        stream = request.stream
+
+    try:
+        summary = import_meals(stream, fmt, str(session["user_id"]))
+    except UnicodeDecodeError:
+        return jsonify({"error": "File must be UTF-8 encoded"}), 400
+    except Exception as e:
+        logger.exception("Import failed")
+        return jsonify({"error": "Import failed"}), 500
+
+    status = 201 if summary["inserted"] else 400
+    return jsonify(summary), status
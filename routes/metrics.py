@@ -0,0 +1,16 @@
+import os
+from flask import Blueprint, Response, request
+from services.metrics import REGISTRY
+
+# Blueprint setup
+metrics_bp = Blueprint("metrics", __name__)
+
+# Optional shared secret for scrapers: Authorization: Bearer <METRICS_TOKEN>
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# ✅ Prometheus scrape endpoint (per process: each worker reports its own series)
+@metrics_bp.route("/metrics")
+def metrics():
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        return Response("Unauthorized\n", status=401, mimetype="text/plain")
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
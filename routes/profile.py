@@ -1,6 +1,10 @@
-from flask import Blueprint, session, render_template, redirect, request
+from flask import Blueprint, session, render_template, redirect, request, jsonify
+from pymongo.errors import DuplicateKeyError
 from database.db import db
 from bson.objectid import ObjectId
+from services import dashboard_cache, notifications
+from services.meals import rebuild_daily_totals
+from services.timezones import DEFAULT_TZ, forget_user_timezone, is_valid_timezone
 
 # ✅ Add url_prefix here
 profile_bp = Blueprint("profile", __name__, url_prefix="/profile")
@@ -44,7 +48,26 @@ def edit_profile():
             "goal_calories": float(request.form.get("goal_calories") or 2000)
         }
 
-        users.update_one({"_id": user_id}, {"$set": updated_data})
+        # A blank email field keeps the current address
+        if not updated_data["email"]:
+            del updated_data["email"]
+
+        # IANA name (e.g. "Europe/London"); unknown values leave the current setting alone
+        tz_name = request.form.get("timezone", "").strip()
+        if is_valid_timezone(tz_name):
+            updated_data["timezone"] = tz_name
+
+        try:
+            previous = users.find_one_and_update({"_id": user_id}, {"$set": updated_data}, projection={"timezone": 1})
+        except DuplicateKeyError:
+            return jsonify({"error": "User already exists"}), 400
+        if previous is not None:
+            dashboard_cache.invalidate(user_id)  # goal or timezone may have changed
+            notifications.invalidate(user_id)
+            if "timezone" in updated_data and previous.get("timezone", DEFAULT_TZ) != tz_name:
+                forget_user_timezone(user_id)
+                # daily_totals are keyed by local date, so regroup this user's history
+                rebuild_daily_totals(user_id=str(user_id), tz_name=tz_name)
         return redirect("/profile")
 
     user = users.find_one({"_id": user_id})
@@ -0,0 +1,13 @@
+from flask import Blueprint, jsonify, session
+from services.quota import limiter, QUOTA_BACKEND
+
+# Blueprint setup
+quota_bp = Blueprint("quota", __name__)
+
+# ✅ What's left of the caller's and the app-wide Nutritionix quota (cache hits never spend any)
+@quota_bp.route("/quota")
+def quota_remaining():
+    if "user_id" not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    return jsonify(dict(limiter.remaining(str(session["user_id"])), backend=QUOTA_BACKEND)), 200
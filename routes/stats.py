@@ -0,0 +1,44 @@
+from flask import Blueprint, jsonify, request, session
+from routes.metrics import METRICS_TOKEN
+from services.nutrients import cache_stats, flight_stats, batch_stats
+from services.nutritionix import client
+from services.food_index import index_stats
+from services.upc_cache import upc_stats, upc_flight
+from services import dashboard_cache
+from services.image_jobs import image_jobs, recognition_stats
+from services.passwords import hash_pool
+from services.logs import log_stats
+from services.events import event_stats
+from services.quota import quota_stats
+
+# Blueprint setup
+stats_bp = Blueprint("stats", __name__)
+
+# ✅ Lookup-layer counters (used to size caches). Internal state, so it's guarded like /metrics:
+# the METRICS_TOKEN bearer token when one is configured, otherwise a signed-in session
+@stats_bp.route("/stats")
+def lookup_stats():
+    if METRICS_TOKEN:
+        if request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+            return jsonify({"error": "Unauthorized"}), 401
+    elif "user_id" not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    return jsonify({
+        "nutrient_cache": cache_stats(),
+        "upc_cache": upc_stats(),
+        "food_index": index_stats(),
+        "batched_lookups": batch_stats(),
+        "single_flight": {
+            "nutrients": flight_stats(),
+            "upc": upc_flight.stats()
+        },
+        "nutritionix": client.stats(),
+        "dashboard_cache": dashboard_cache.cache_stats(),
+        "image_jobs": image_jobs.stats(),
+        "image_recognitions": recognition_stats(),
+        "password_hashing": hash_pool.stats(),
+        "logging": log_stats(),
+        "live_events": event_stats(),
+        "upstream_quota": quota_stats()
+    })
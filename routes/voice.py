@@ -1,21 +1,17 @@
-import os
-import requests
 from flask import Blueprint, request, jsonify, session
-from datetime import datetime
-from database.db import db
 from dotenv import load_dotenv
-import pytz
+from services.meals import log_items
+from services.timezones import local_now, user_timezone, utc_now
+from services.logs import get_logger
+from services.quota import retry_after_header
+
+logger = get_logger(__name__)
 
 # Load environment variables
 load_dotenv()
 
 # Blueprint setup
 voice_bp = Blueprint("voice", __name__)
-foods = db["foods"]
-
-# Nutritionix API credentials
-APP_ID = os.getenv("NUTRITIONIX_APP_ID")
-API_KEY = os.getenv("NUTRITIONIX_API_KEY")
 
 # Voice Logging Route
 @voice_bp.route("/voice-log", methods=["POST"])
@@ -30,41 +26,12 @@ def voice_log():
         if not query:
             return jsonify({"error": "No voice input provided"}), 400
 
-        headers = {
-            "x-app-id": APP_ID,
-            "x-app-key": API_KEY,
-            "Content-Type": "application/json"
-        }
-
-        payload = {
-            "query": query,
-            "timezone": "Asia/Kolkata"
-        }
-
-        response = requests.post(
-            "https://trackapi.nutritionix.com/v2/natural/nutrients",
-            headers=headers,
-            json=payload
-        )
-
-        if response.status_code != 200:
-            print(f"[API ERROR] Nutritionix status code: {response.status_code}, body: {response.text}")
-            return jsonify({
-                "error": "Nutritionix API failed",
-                "status_code": response.status_code,
-                "details": response.text
-            }), 502
-
-        nutrition_data = response.json()
-
-        if not nutrition_data.get("foods"):
-            return jsonify({"error": "No recognizable food item found."}), 400
-
-        now = datetime.now(pytz.timezone("Asia/Kolkata"))
-        hour = now.hour
         user_id = str(session["user_id"])
+        tz_name = user_timezone(user_id)
+        now = utc_now()
+        hour = local_now(tz_name).hour
 
-        # Determine meal type
+        # Determine meal type from the user's local time
         if 5 <= hour < 11:
             meal_type = "Breakfast"
         elif 11 <= hour < 16:
@@ -74,31 +41,34 @@ def voice_log():
         else:
             meal_type = "Snack"
 
-        logged_foods = []
-
-        for item in nutrition_data["foods"]:
-            food_name = item.get("food_name", "Unknown")
-            calories = item.get("nf_calories", 0)
-
-            food_entry = {
-                "user_id": user_id,
-                "food_name": food_name,
-                "calories": calories,
-                "meal_type": meal_type,
-                "timestamp": now
-            }
-
-            insert_result = foods.insert_one(food_entry)
-            food_entry["_id"] = str(insert_result.inserted_id)
+        # Every recognized item is written with one insert_many
+        result = log_items(user_id, [{"query": query, "meal_type": meal_type}], now, tz_name)[0]
 
-            logged_foods.append({
-                "_id": food_entry["_id"],
-                "food_name": food_name,
-                "calories": calories,
+        if "retry_after" in result:
+            return jsonify({"error": "Too many food lookups right now, try again shortly"}), 429, \
+                retry_after_header(result["retry_after"])
+        if result["status"] != "logged" and "status_code" in result:
+            logger.warning("Voice log Nutritionix error", status_code=result["status_code"], details=result["details"])
+            return jsonify({
+                "error": "Nutritionix API failed",
+                "status_code": result["status_code"],
+                "details": result["details"]
+            }), 502
+        if result["status"] != "logged" and not result.get("logs"):
+            # "logs" is only present when Nutritionix answered and the insert failed
+            return jsonify({"error": result["error"]}), 500 if "logs" in result else 400
+
+        logged_foods = [
+            {
+                "_id": log["_id"],
+                "food_name": log["food_name"],
+                "calories": log["calories"],
                 "meal_type": meal_type
-            })
+            }
+            for log in result["logs"]
+        ]
 
-        print(f"[VOICE LOGGED] User: {user_id}, Query: '{query}', Items: {len(logged_foods)}, Time: {now}")
+        logger.info("Voice logged", items=len(logged_foods), meal_type=meal_type, sample_rate=0.1)
 
         return jsonify({
             "message": "Food logged successfully!",
@@ -106,5 +76,5 @@ def voice_log():
         }), 200
 
     except Exception as e:
-        print(f"[SERVER ERROR] Voice logging failed: {str(e)}")
+        logger.exception("Voice logging failed")
         return jsonify({"error": f"Server error: {str(e)}"}), 500
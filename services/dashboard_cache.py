@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+from dotenv import load_dotenv
+from pymongo.errors import DuplicateKeyError
+
+from database.db import db
+from services.cache import TTLCache
+from services.logs import get_logger
+
+logger = get_logger(__name__)
+
+load_dotenv()
+
+# "memory" is enough for a single worker; multi-worker deployments need "mongo" so a
+# write handled by one worker invalidates the entry every worker reads
+CACHE_BACKEND = os.getenv("DASHBOARD_CACHE_BACKEND", "memory").lower()
+CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", 600))
+CACHE_SIZE = int(os.getenv("DASHBOARD_CACHE_SIZE", 10000))
+
+
+def make_etag(payload):
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(body.encode()).hexdigest()
+
+
+# Every backend keeps a per-user generation next to the entry. invalidate() bumps it, and
+# set() only stores when it is still the generation read before the payload was computed,
+# so a dashboard built before a write can't be cached after it.
+class MemoryBackend:
+    name = "memory"
+
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generations = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        return self._cache.get(user_id)
+
+    def generation(self, user_id):
+        return self._generations.get(user_id, 0)
+
+    def set(self, user_id, entry, generation):
+        with self._lock:
+            if self._generations.get(user_id, 0) != generation:
+                return False
+            self._cache.set(user_id, entry)
+            return True
+
+    def delete(self, user_id):
+        with self._lock:
+            self._generations.set(user_id, self._generations.get(user_id, 0) + 1)
+            self._cache.pop(user_id)
+
+    def stats(self):
+        return dict(self._cache.stats(), generations=len(self._generations))
+
+
+class MongoBackend:
+    name = "mongo"
+
+    def __init__(self, collection, ttl=CACHE_TTL):
+        self.collection = collection
+        self.ttl = ttl
+
+    def _expires_at(self):
+        return datetime.now(timezone.utc) + timedelta(seconds=self.ttl)
+
+    def get(self, user_id):
+        doc = self.collection.find_one(
+            {"_id": user_id, "payload": {"$exists": True}, "expires_at": {"$gt": datetime.now(timezone.utc)}},
+            {"_id": 0, "expires_at": 0, "gen": 0}
+        )
+        return doc
+
+    def generation(self, user_id):
+        doc = self.collection.find_one({"_id": user_id}, {"gen": 1})
+        return (doc or {}).get("gen") or 0
+
+    # The filter only matches the generation we started from; if another worker has bumped
+    # it since, the upsert collides on _id and nothing is written
+    def set(self, user_id, entry, generation):
+        gen_filter = {"$in": [0, None]} if generation == 0 else generation
+        try:
+            self.collection.update_one(
+                {"_id": user_id, "gen": gen_filter},
+                {"$set": dict(entry, gen=generation, expires_at=self._expires_at())},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    def delete(self, user_id):
+        self.collection.update_one(
+            {"_id": user_id},
+            {"$inc": {"gen": 1}, "$unset": {"day": "", "payload": "", "etag": ""},
+             "$set": {"expires_at": self._expires_at()}},
+            upsert=True
+        )
+
+    def stats(self):
+        return {"ttl": self.ttl}
+
+
+class NullBackend:
+    name = "none"
+
+    def get(self, user_id):
+        return None
+
+    def generation(self, user_id):
+        return 0
+
+    def set(self, user_id, entry, generation):
+        return False
+
+    def delete(self, user_id):
+        pass
+
+    def stats(self):
+        return {}
+
+
+def _make_backend(name):
+    if name == "mongo":
+        return MongoBackend(db["dashboard_cache"])
+    if name == "none":
+        return NullBackend()
+    return MemoryBackend()
+
+
+backend = _make_backend(CACHE_BACKEND)
+_stats = {"hits": 0, "misses": 0, "invalidations": 0, "errors": 0, "skipped_stores": 0}
+
+
+# Read before computing a payload and handed back to store(); None if the backend failed
+def generation(user_id):
+    try:
+        return backend.generation(str(user_id))
+    except Exception as e:
+        logger.error("Dashboard cache read error", error=str(e))
+        _stats["errors"] += 1
+        return None
+
+
+# ✅ Cached payload for this user's `day`, or None (a new day is always a miss)
+def get_cached(user_id, day):
+    try:
+        entry = backend.get(user_id)
+    except Exception as e:
+        logger.error("Dashboard cache read error", error=str(e))
+        _stats["errors"] += 1
+        return None
+
+    if entry is None or entry.get("day") != day:
+        _stats["misses"] += 1
+        return None
+    _stats["hits"] += 1
+    return entry["payload"], entry["etag"]
+
+
+def store(user_id, day, payload, computed_at_generation):
+    etag = make_etag(payload)
+    if computed_at_generation is None:
+        _stats["skipped_stores"] += 1
+        return etag
+    try:
+        if not backend.set(str(user_id), {"day": day, "payload": payload, "etag": etag}, computed_at_generation):
+            _stats["skipped_stores"] += 1
+    except Exception as e:
+        logger.error("Dashboard cache write error", error=str(e))
+        _stats["errors"] += 1
+    return etag
+
+
+# ✅ Called by every path that changes a user's meals or goal
+def invalidate(user_id):
+    try:
+        backend.delete(str(user_id))
+        _stats["invalidations"] += 1
+    except Exception as e:
+        logger.error("Dashboard cache invalidation error", error=str(e))
+        _stats["errors"] += 1
+
+
+def cache_stats():
+    return dict(_stats, backend=backend.name, backend_stats=backend.stats())
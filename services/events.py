@@ -0,0 +1,207 @@
+import itertools
+import os
+import queue
+import threading
+import time
+from datetime import timedelta
+
+from dotenv import load_dotenv
+
+from database.db import db
+from services.logs import get_logger
+from services.timezones import local_date, to_local, user_timezone, utc_now
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+# "memory" only reaches streams held by the worker that handled the write; "mongo" fans out
+# through a change stream on live_events, so every worker sees every write (needs a replica set)
+EVENTS_BACKEND = os.getenv("LIVE_EVENTS_BACKEND", "memory").lower()
+SUBSCRIBER_QUEUE = int(os.getenv("LIVE_EVENTS_QUEUE", 100))
+# A write touching more meals than this for one user sends a single "resync" instead of deltas
+MAX_DELTAS_PER_WRITE = int(os.getenv("LIVE_EVENTS_MAX_DELTAS", 20))
+EVENT_TTL = int(os.getenv("LIVE_EVENTS_TTL", 300))
+live_events = db["live_events"]
+
+_ids = itertools.count(1)
+
+
+class Subscription:
+    def __init__(self, user_id, maxsize=SUBSCRIBER_QUEUE):
+        self.user_id = user_id
+        self.queue = queue.Queue(maxsize)
+        self.overflowed = False
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+# ✅ In-process pub/sub keyed by user id. publish() never blocks: a subscriber that falls
+# behind is flagged and gets a "resync" instead of the events it missed.
+class EventBus:
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self.counts = {"published": 0, "delivered": 0, "overflows": 0}
+
+    def subscribe(self, user_id):
+        subscription = Subscription(str(user_id))
+        with self._lock:
+            self._subscribers.setdefault(subscription.user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def publish(self, user_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(str(user_id), ()))
+            self.counts["published"] += 1
+        for subscription in subscribers:
+            if subscription.overflowed:
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+                self.counts["delivered"] += 1
+            except queue.Full:
+                subscription.overflowed = True
+                self.counts["overflows"] += 1
+
+    def broadcast(self, event):
+        with self._lock:
+            user_ids = list(self._subscribers)
+        for user_id in user_ids:
+            self.publish(user_id, event)
+
+    def has_subscribers(self, user_id):
+        return str(user_id) in self._subscribers
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts, users=len(self._subscribers),
+                        streams=sum(len(s) for s in self._subscribers.values()))
+
+
+bus = EventBus()
+
+
+# --------------------------
+# MONGO FAN-OUT
+# --------------------------
+
+# ✅ One watcher thread per process tails the live_events change stream and republishes
+# locally. Started with the first stream; a gap after a reconnect triggers a resync.
+class ChangeStreamRelay:
+    def __init__(self, collection, target):
+        self.collection = collection
+        self.target = target
+        self._pid = None
+        self._lock = threading.Lock()
+        self.counts = {"relayed": 0, "reconnects": 0}
+
+    def ensure_started(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid != pid:
+                threading.Thread(target=self._run, name="live-events-relay", daemon=True).start()
+                self._pid = pid
+
+    def _run(self):
+        resume_token = None
+        while True:
+            try:
+                with self.collection.watch([{"$match": {"operationType": "insert"}}],
+                                           resume_after=resume_token) as stream:
+                    for change in stream:
+                        resume_token = stream.resume_token
+                        doc = change["fullDocument"]
+                        self.target.publish(doc["user_id"], doc["event"])
+                        self.counts["relayed"] += 1
+            except Exception as e:
+                logger.error("Live events change stream error", error=str(e))
+                self.counts["reconnects"] += 1
+                # Whatever happened while we were away is lost; tell every open stream to refetch
+                self.target.broadcast({"type": "resync"})
+                time.sleep(2)
+
+
+relay = ChangeStreamRelay(live_events, bus)
+
+
+def _emit(user_id, event):
+    event = dict(event, id=f"{os.getpid()}-{next(_ids)}")
+    if EVENTS_BACKEND != "mongo":
+        bus.publish(user_id, event)
+        return
+    try:
+        live_events.insert_one({"user_id": str(user_id), "event": event,
+                                "expires_at": utc_now() + timedelta(seconds=EVENT_TTL)})
+    except Exception as e:
+        logger.error("Live event write error", error=str(e))
+        bus.publish(user_id, event)
+
+
+# ✅ Same shape as the meals in /api/dashboard, plus the delta to the day's totals
+def _meal_event(kind, meal, tz_name):
+    sign = 1 if kind == "meal_added" else -1
+    return {
+        "type": kind,
+        "day": local_date(meal["timestamp"], tz_name),
+        "meal": {
+            "_id": str(meal["_id"]),
+            "food_name": meal.get("food_name") or "Unnamed",
+            "calories": meal.get("calories") or 0,
+            "meal_type": meal.get("meal_type") or "Meal",
+            "timestamp": to_local(meal["timestamp"], tz_name).isoformat(),
+        },
+        "delta": {field: sign * (meal.get(field) or 0) for field in ("calories", "protein", "carbs", "fat")},
+    }
+
+
+# ✅ Called by services.meals after every write to `foods`
+def publish_meals(kind, meals):
+    by_user = {}
+    for meal in meals:
+        by_user.setdefault(str(meal["user_id"]), []).append(meal)
+
+    for user_id, user_meals in by_user.items():
+        # Nobody is listening on this worker; in mongo mode another worker might be
+        if EVENTS_BACKEND != "mongo" and not bus.has_subscribers(user_id):
+            continue
+        try:
+            if len(user_meals) > MAX_DELTAS_PER_WRITE:
+                _emit(user_id, {"type": "resync"})
+                continue
+            tz_name = user_timezone(user_id)
+            for meal in user_meals:
+                _emit(user_id, _meal_event(kind, meal, tz_name))
+        except Exception as e:
+            logger.error("Live event publish error", error=str(e))
+
+
+def subscribe(user_id):
+    if EVENTS_BACKEND == "mongo":
+        relay.ensure_started()
+    return bus.subscribe(user_id)
+
+
+def unsubscribe(subscription):
+    bus.unsubscribe(subscription)
+
+
+def event_stats():
+    stats = dict(bus.stats(), backend=EVENTS_BACKEND)
+    if EVENTS_BACKEND == "mongo":
+        stats["relay"] = relay.counts
+    return stats
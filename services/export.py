@@ -0,0 +1,89 @@
+import csv
+import io
+import json
+import os
+import zlib
+from datetime import timezone
+
+from database.db import db
+
+foods = db["foods"]
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+# Rows are buffered into chunks of about this many bytes before being sent
+CHUNK_BYTES = 64 * 1024
+
+EXPORT_FIELDS = ("_id", "timestamp", "food_name", "meal_type", "calories", "protein", "carbs", "fat")
+_PROJECTION = {field: 1 for field in EXPORT_FIELDS}
+
+
+# ✅ Server-side cursor over one user's log, oldest first, only the exported fields
+def export_cursor(user_id):
+    return foods.find({"user_id": user_id}, _PROJECTION) \
+        .sort("timestamp", 1) \
+        .batch_size(EXPORT_BATCH_SIZE)
+
+
+def _row(doc):
+    ts = doc.get("timestamp")
+    if ts is not None:
+        ts = (ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)).isoformat()
+    return {
+        "_id": str(doc.get("_id", "")),
+        "timestamp": ts or "",
+        "food_name": doc.get("food_name", ""),
+        "meal_type": doc.get("meal_type", ""),
+        "calories": doc.get("calories", 0),
+        "protein": doc.get("protein", 0),
+        "carbs": doc.get("carbs", 0),
+        "fat": doc.get("fat", 0),
+    }
+
+
+def iter_csv(docs):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for doc in docs:
+        writer.writerow(_row(doc))
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def iter_ndjson(docs):
+    parts, size = [], 0
+    for doc in docs:
+        line = json.dumps(_row(doc), separators=(",", ":")) + "\n"
+        parts.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield "".join(parts).encode()
+            parts, size = [], 0
+    if parts:
+        yield "".join(parts).encode()
+
+
+def gzip_chunks(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = gzip container
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+FORMATS = {
+    "csv": (iter_csv, "text/csv", "csv"),
+    "ndjson": (iter_ndjson, "application/x-ndjson", "ndjson"),
+}
+
+
+# ✅ Generator of encoded chunks; memory stays flat however long the history is
+def stream_export(docs, fmt="csv", gzip=False):
+    serializer = FORMATS[fmt][0]
+    chunks = serializer(docs)
+    return gzip_chunks(chunks) if gzip else chunks
@@ -0,0 +1,374 @@
+import csv
+import os
+import re
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from database.db import db
+from services.logs import get_logger
+
+logger = get_logger(__name__)
+
+load_dotenv()
+
+INDEX_ENABLED = os.getenv("FOOD_INDEX_ENABLED", "true").lower() in ("1", "true", "yes")
+# A fuzzy match is only trusted when it's this close overall AND every word pairs up with a
+# word of the stored name (so "chocolate" never becomes "chocolate milk"); the rest go upstream
+MIN_SCORE = float(os.getenv("FOOD_INDEX_MIN_SCORE", 0.85))
+WORD_MIN_SCORE = 0.5
+RELOAD_AFTER_ERROR = 60
+
+food_index_docs = db["food_index"]
+
+NUTRIENT_FIELDS = ("nf_calories", "nf_protein", "nf_total_carbohydrate", "nf_total_fat")
+
+_NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "half": 0.5,
+}
+_UNITS = {
+    "cup": "cup", "cups": "cup", "bowl": "bowl", "bowls": "bowl", "plate": "plate", "plates": "plate",
+    "piece": "piece", "pieces": "piece", "slice": "slice", "slices": "slice",
+    "glass": "glass", "glasses": "glass", "tbsp": "tbsp", "tablespoon": "tbsp", "tablespoons": "tbsp",
+    "tsp": "tsp", "teaspoon": "tsp", "teaspoons": "tsp", "g": "g", "gram": "g", "grams": "g",
+    "ml": "ml", "oz": "oz", "ounce": "oz", "ounces": "oz",
+}
+_MEASURES = {"cup", "tbsp", "tsp", "g", "ml", "oz"}
+# One of these is never a portion: a bare "chicken" against a per-gram entry has no size
+_WEIGHTS = {"g", "ml", "oz"}
+_QUANTITY = re.compile(r"^(\d+(?:\.\d+)?|\d+/\d+)\s*")
+_SPLIT_ITEMS = re.compile(r"\s*(?:,|&|\band\b|\bwith\b)\s*")
+_NON_WORD = re.compile(r"[^a-z0-9 ]+")
+
+
+def _singular(word):
+    if len(word) > 3 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("es") and word[-3] in "sxz":
+        return word[:-2]
+    if len(word) > 2 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def normalize_name(name):
+    words = _NON_WORD.sub(" ", (name or "").lower()).split()
+    return " ".join(_singular(w) for w in words)
+
+
+# "2 eggs, toast and coffee" -> ["2 eggs", "toast", "coffee"]
+def split_items(query):
+    return [p for p in _SPLIT_ITEMS.split(query or "") if p]
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _similarity(a_grams, b_grams):
+    common = len(a_grams & b_grams)
+    return common / (len(a_grams) + len(b_grams) - common)
+
+
+# Same number of words, each one close to a different word of the candidate (typos and word
+# order are fine, an extra or a different word is not)
+def _words_agree(key, candidate):
+    words, remaining = key.split(), candidate.split()
+    if len(words) != len(remaining):
+        return False
+    for word in words:
+        grams = _trigrams(word)
+        scores = [(_similarity(grams, _trigrams(other)), i) for i, other in enumerate(remaining)]
+        score, i = max(scores)
+        if score < WORD_MIN_SCORE:
+            return False
+        remaining.pop(i)
+    return True
+
+
+def _parse_quantity(text):
+    qty = None
+    match = _QUANTITY.match(text)
+    if match:
+        raw = match.group(1)
+        if "/" in raw:
+            num, den = raw.split("/")
+            qty = float(num) / float(den) if float(den) else None
+        else:
+            qty = float(raw)
+        text = text[match.end():]
+    else:
+        first, _, rest = text.partition(" ")
+        if first in _NUMBER_WORDS and rest:
+            qty, text = _NUMBER_WORDS[first], rest
+
+    unit = None
+    first, _, rest = text.partition(" ")
+    if first in _UNITS and rest:
+        unit, text = _UNITS[first], rest
+        if text.startswith("of "):
+            text = text[3:]
+    return qty, unit, text
+
+
+# ✅ In-memory food table with an exact-name map and a trigram index for fuzzy matches
+class FoodIndex:
+    def __init__(self, min_score=MIN_SCORE):
+        self.min_score = min_score
+        self.entries = []
+        self._by_name = {}
+        self._key_entry = []
+        self._key_name = []
+        self._key_size = []
+        self._trigrams = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.low_confidence = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, entry, replace=False):
+        names = [entry["food_name"]] + list(entry.get("aliases") or [])
+        keys = [k for k in (normalize_name(n) for n in names if n) if k]
+        if not keys:
+            return False
+        with self._lock:
+            existing = self._by_name.get(keys[0])
+            if existing is not None:
+                if replace:
+                    self.entries[existing] = entry
+                return replace
+
+            idx = len(self.entries)
+            self.entries.append(entry)
+            for key in keys:
+                if key in self._by_name:
+                    continue
+                self._by_name[key] = idx
+                key_idx = len(self._key_entry)
+                grams = _trigrams(key)
+                self._key_entry.append(idx)
+                self._key_name.append(key)
+                self._key_size.append(len(grams))
+                for gram in grams:
+                    self._trigrams.setdefault(gram, set()).add(key_idx)
+        return True
+
+    def match(self, name):
+        key = normalize_name(name)
+        if not key:
+            return None, 0.0
+
+        with self._lock:
+            idx = self._by_name.get(key)
+            if idx is not None:
+                return self.entries[idx], 1.0
+
+            grams = _trigrams(key)
+            overlap = {}
+            for gram in grams:
+                for key_idx in self._trigrams.get(gram, ()):
+                    overlap[key_idx] = overlap.get(key_idx, 0) + 1
+
+            best, best_score = None, 0.0
+            for key_idx, common in overlap.items():
+                score = common / (len(grams) + self._key_size[key_idx] - common)
+                if score > best_score and _words_agree(key, self._key_name[key_idx]):
+                    best, best_score = self.entries[self._key_entry[key_idx]], score
+            return best, best_score
+
+    def _resolve_item(self, text):
+        qty, unit, name = _parse_quantity(text)
+        entry, score = self.match(name)
+        if entry is None or score < self.min_score:
+            return None
+        entry_unit = _UNITS.get(str(entry.get("serving_unit") or "").lower())
+        if unit and unit != entry_unit:
+            return None
+        # "2 rice" against a "100 g" serving is ambiguous
+        if qty and not unit and entry_unit in _MEASURES:
+            return None
+
+        # No quantity means one serving: one unit of a learned entry, the stated serving of a CSV row
+        serving_qty = entry.get("serving_qty") or 1
+        if not qty and entry_unit in _WEIGHTS and serving_qty == 1:
+            return None
+        factor = (qty / serving_qty) if qty else 1
+        food = {
+            "food_name": entry["food_name"],
+            "serving_qty": qty or serving_qty,
+            "serving_unit": entry.get("serving_unit"),
+            "match_score": round(score, 3),
+            "source": "local_index",
+        }
+        if entry.get("serving_weight_grams"):
+            food["serving_weight_grams"] = round(entry["serving_weight_grams"] * factor, 2)
+        for field in NUTRIENT_FIELDS:
+            food[field] = round((entry.get(field) or 0) * factor, 2)
+        return food
+
+    # Every item in the phrase must match confidently, otherwise the caller asks Nutritionix
+    def resolve(self, query):
+        parts = split_items(query)
+        resolved = []
+        for part in parts:
+            food = self._resolve_item(part)
+            if food is None:
+                if self.entries:
+                    self.low_confidence += 1
+                self.misses += 1
+                return None
+            resolved.append(food)
+
+        if not resolved:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return resolved
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "low_confidence": self.low_confidence,
+            "min_score": self.min_score,
+        }
+
+
+# Nutritionix answers "3 rotis" with serving_qty=3; learned entries are stored per single
+# unit so one user's portion never becomes everyone's default
+def per_unit(entry):
+    serving_qty = entry.get("serving_qty") or 1
+    if serving_qty == 1:
+        return entry
+    entry = dict(entry, serving_qty=1)
+    if entry.get("serving_weight_grams"):
+        entry["serving_weight_grams"] = round(entry["serving_weight_grams"] / serving_qty, 4)
+    for field in NUTRIENT_FIELDS:
+        entry[field] = round((entry.get(field) or 0) / serving_qty, 4)
+    return entry
+
+
+def entry_from_nutritionix(food, source="nutritionix"):
+    if not food.get("food_name") or food.get("source") == "local_index":
+        return None
+    entry = {
+        "food_name": food["food_name"],
+        "serving_qty": food.get("serving_qty") or 1,
+        "serving_unit": food.get("serving_unit"),
+        "serving_weight_grams": food.get("serving_weight_grams"),
+        "aliases": [],
+        "source": source,
+    }
+    for field in NUTRIENT_FIELDS:
+        entry[field] = food.get(field) or 0
+    return per_unit(entry)
+
+
+def entry_from_csv_row(row):
+    entry = {
+        "food_name": (row.get("food_name") or "").strip(),
+        "serving_qty": float(row.get("serving_qty") or 1),
+        "serving_unit": (row.get("serving_unit") or "serving").strip(),
+        "serving_weight_grams": float(row["serving_weight_grams"]) if row.get("serving_weight_grams") else None,
+        "aliases": [a.strip() for a in (row.get("aliases") or "").split(";") if a.strip()],
+        "source": "csv",
+        "nf_calories": float(row.get("calories") or 0),
+        "nf_protein": float(row.get("protein") or 0),
+        "nf_total_carbohydrate": float(row.get("carbs") or 0),
+        "nf_total_fat": float(row.get("fat") or 0),
+    }
+    return entry if entry["food_name"] else None
+
+
+# --------------------------
+# Process-wide index, loaded lazily from Mongo
+# --------------------------
+
+food_index = FoodIndex()
+_load_lock = threading.Lock()
+_loaded_at = None
+_load_failed = False
+
+
+def _ensure_loaded():
+    global _loaded_at, _load_failed
+    if _loaded_at is not None and not (_load_failed and time.monotonic() - _loaded_at > RELOAD_AFTER_ERROR):
+        return
+    with _load_lock:
+        if _loaded_at is not None and not (_load_failed and time.monotonic() - _loaded_at > RELOAD_AFTER_ERROR):
+            return
+        try:
+            for doc in food_index_docs.find({}, {"_id": 0}):
+                # Entries learned before they were stored per unit
+                food_index.add(per_unit(doc) if doc.get("source") == "nutritionix" else doc)
+            _load_failed = False
+        except Exception as e:
+            logger.error("Food index load error", error=str(e))
+            _load_failed = True
+        _loaded_at = time.monotonic()
+
+
+def save_entry(entry, replace=False):
+    if not food_index.add(entry, replace=replace):
+        return False
+    key = normalize_name(entry["food_name"])
+    if replace:
+        food_index_docs.replace_one({"_id": key}, dict(entry, _id=key), upsert=True)
+    else:
+        food_index_docs.update_one({"_id": key}, {"$setOnInsert": entry}, upsert=True)
+    return True
+
+
+# ✅ Resolve a phrase locally; None means "ask Nutritionix"
+def resolve_locally(query):
+    if not INDEX_ENABLED:
+        return None
+    _ensure_loaded()
+    return food_index.resolve(query)
+
+
+# ✅ Remember foods Nutritionix returned so the next lookup stays local
+def learn(foods_list):
+    if not INDEX_ENABLED:
+        return
+    for food in foods_list:
+        entry = entry_from_nutritionix(food)
+        if entry is None:
+            continue
+        try:
+            save_entry(entry)
+        except Exception as e:
+            logger.error("Food index write error", error=str(e))
+
+
+def seed_from_cache():
+    added = 0
+    for doc in db["nutrient_cache"].find({}, {"foods": 1}):
+        for food in doc.get("foods", []):
+            entry = entry_from_nutritionix(food)
+            if entry and save_entry(entry):
+                added += 1
+    return added
+
+
+def import_csv(path):
+    added, skipped = 0, 0
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            entry = entry_from_csv_row(row)
+            if entry and save_entry(entry, replace=True):
+                added += 1
+            else:
+                skipped += 1
+    return added, skipped
+
+
+def index_stats():
+    return food_index.stats()
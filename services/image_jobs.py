@@ -0,0 +1,98 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+from dotenv import load_dotenv
+
+from database.db import db
+from services.cache import TTLCache
+from services.jobs import JobQueue
+from services.logs import get_logger
+from services.meals import build_meal, save_meal
+from services.nutrients import lookup_nutrients
+from services.recognition import recognize_food
+from services.timezones import utc_now
+
+logger = get_logger(__name__)
+
+load_dotenv()
+
+# Kept small on purpose: recognition is CPU/GPU heavy and must not starve the web threads
+IMAGE_JOB_WORKERS = int(os.getenv("IMAGE_JOB_WORKERS", 2))
+IMAGE_JOB_QUEUE = int(os.getenv("IMAGE_JOB_QUEUE", 20))
+
+# Same bytes, same food: recognition results are cached by the image's SHA-256
+RECOGNITION_CACHE_SIZE = int(os.getenv("RECOGNITION_CACHE_SIZE", 4096))
+RECOGNITION_CACHE_TTL = int(os.getenv("RECOGNITION_CACHE_TTL", 30 * 24 * 3600))
+
+image_jobs = JobQueue("image", max_workers=IMAGE_JOB_WORKERS, max_queued=IMAGE_JOB_QUEUE,
+                      collection=db["jobs"])
+recognition_cache = TTLCache(maxsize=RECOGNITION_CACHE_SIZE, ttl=RECOGNITION_CACHE_TTL)
+recognitions = db["image_recognitions"]
+
+CACHED_FIELDS = ("food_name", "nf_calories", "nf_protein", "nf_total_carbohydrate", "nf_total_fat")
+
+
+def _cached_recognition(digest):
+    food = recognition_cache.get(digest)
+    if food is not None:
+        return food
+    try:
+        doc = recognitions.find_one({"_id": digest, "expires_at": {"$gt": datetime.now(timezone.utc)}})
+    except Exception as e:
+        logger.error("Recognition cache read error", error=str(e))
+        return None
+    if doc is None:
+        return None
+    recognition_cache.set(digest, doc["food"])
+    return doc["food"]
+
+
+def _remember_recognition(digest, food_data):
+    food = {field: food_data.get(field) for field in CACHED_FIELDS}
+    recognition_cache.set(digest, food)
+    try:
+        recognitions.replace_one(
+            {"_id": digest},
+            {"food": food, "expires_at": datetime.now(timezone.utc) + timedelta(seconds=RECOGNITION_CACHE_TTL)},
+            upsert=True
+        )
+    except Exception as e:
+        logger.error("Recognition cache write error", error=str(e))
+
+
+def _log_recognized(user_id, food_data):
+    log = build_meal(user_id, food_data, "Image", utc_now())
+    log_id = save_meal(log)
+    return {
+        "log_id": str(log_id),
+        "food_name": log["food_name"],
+        "calories": log["calories"],
+        "message": f"Food logged: {log['food_name']} ({log['calories']} kcal)"
+    }
+
+
+# ✅ Runs on the job pool: recognize, look up nutrients, remember the result, log the meal
+def process_image(user_id, image_bytes, digest):
+    recognized_food = recognize_food(image_bytes)
+    # Runs on a job thread with no request, so name whose quota an upstream call spends
+    foods_list = lookup_nutrients(recognized_food, user_id=user_id)
+    if not foods_list:
+        raise ValueError("Failed to get nutrition info")
+
+    _remember_recognition(digest, foods_list[0])
+    return _log_recognized(user_id, foods_list[0])
+
+
+# ✅ A photo we've already recognized is logged on the spot; anything new goes to the pool.
+# Returns {"status": "done", "result": ...} or {"status": "queued", "job_id": ...}; raises QueueFull.
+def log_image(user_id, image_bytes, digest):
+    food = _cached_recognition(digest)
+    if food is not None:
+        return {"status": "done", "result": _log_recognized(user_id, food)}
+
+    job_id = image_jobs.submit(process_image, user_id, image_bytes, digest, owner=user_id)
+    return {"status": "queued", "job_id": job_id}
+
+
+def recognition_stats():
+    return recognition_cache.stats()
@@ -0,0 +1,149 @@
+import csv
+import io
+import json
+import os
+from datetime import datetime, timezone
+
+from services.meals import save_meals
+from services.timezones import get_tz, user_timezone
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 1000))
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", 1000000))
+# Per-chunk error details are capped so a bad file can't blow up the response
+MAX_ERRORS_PER_CHUNK = 20
+MAX_NAME_LENGTH = 200
+
+NUMBER_FIELDS = ("calories", "protein", "carbs", "fat")
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+def _text_stream(stream):
+    if isinstance(stream, io.TextIOBase):
+        return stream
+    if not isinstance(stream, io.BufferedIOBase):
+        stream = io.BufferedReader(stream)
+    return io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+
+
+# ✅ Yields (line_number, row dict or ImportRowError) without reading the whole input
+def iter_rows(stream, fmt):
+    text = _text_stream(stream)
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(text, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_number, ImportRowError("invalid JSON")
+            continue
+        if not isinstance(row, dict):
+            yield line_number, ImportRowError("each line must be a JSON object")
+            continue
+        yield line_number, row
+
+
+def _number(row, field, required=False):
+    value = row.get(field)
+    if value in (None, ""):
+        if required:
+            raise ImportRowError(f"{field} is required")
+        return 0
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ImportRowError(f"{field} must be a number")
+    if number < 0 or number != number:
+        raise ImportRowError(f"{field} must be a non-negative number")
+    return number
+
+
+def _timestamp(value, tz):
+    if not value:
+        raise ImportRowError("timestamp is required")
+    try:
+        ts = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    except ValueError:
+        raise ImportRowError("timestamp must be ISO 8601")
+    # Times without an offset are the user's local wall-clock time; stored as UTC
+    ts = tz.localize(ts) if ts.tzinfo is None else ts
+    return ts.astimezone(timezone.utc)
+
+
+# ✅ Same document shape log_food writes
+def row_to_meal(row, user_id, tz):
+    food_name = str(row.get("food_name") or "").strip()
+    if not food_name:
+        raise ImportRowError("food_name is required")
+
+    meal = {
+        "user_id": user_id,
+        "food_name": food_name[:MAX_NAME_LENGTH],
+        "calories": _number(row, "calories", required=True),
+        "protein": _number(row, "protein"),
+        "carbs": _number(row, "carbs"),
+        "fat": _number(row, "fat"),
+        "meal_type": str(row.get("meal_type") or "Meal").strip()[:50],
+        "timestamp": _timestamp(row.get("timestamp"), tz)
+    }
+    return meal
+
+
+def _flush(chunk_number, first_line, last_line, meals, invalid):
+    ids = save_meals(meals)
+    inserted = sum(1 for meal_id in ids if meal_id is not None)
+    return {
+        "chunk": chunk_number,
+        "lines": [first_line, last_line],
+        "inserted": inserted,
+        "failed_inserts": len(meals) - inserted,
+        "invalid": len(invalid),
+        "errors": invalid[:MAX_ERRORS_PER_CHUNK]
+    }
+
+
+# ✅ Validates and writes rows in fixed-size unordered insert_many chunks; every chunk
+# also updates daily_totals through save_meals
+def import_meals(stream, fmt, user_id, tz_name=None, chunk_size=IMPORT_CHUNK_SIZE):
+    tz = get_tz(tz_name or user_timezone(user_id))
+    summary = {"rows": 0, "inserted": 0, "invalid": 0, "failed_inserts": 0, "truncated": False, "chunks": []}
+
+    meals, invalid, rows_in_chunk = [], [], 0
+    first_line = last_line = None
+    for line_number, row in iter_rows(stream, fmt):
+        if summary["rows"] >= IMPORT_MAX_ROWS:
+            summary["truncated"] = True
+            break
+        summary["rows"] += 1
+        rows_in_chunk += 1
+        first_line = first_line or line_number
+        last_line = line_number
+
+        try:
+            if isinstance(row, ImportRowError):
+                raise row
+            meals.append(row_to_meal(row, user_id, tz))
+        except ImportRowError as e:
+            invalid.append({"line": line_number, "error": str(e)})
+
+        if rows_in_chunk >= chunk_size:
+            summary["chunks"].append(_flush(len(summary["chunks"]) + 1, first_line, last_line, meals, invalid))
+            meals, invalid, rows_in_chunk, first_line = [], [], 0, None
+
+    if rows_in_chunk:
+        summary["chunks"].append(_flush(len(summary["chunks"]) + 1, first_line, last_line, meals, invalid))
+
+    for chunk in summary["chunks"]:
+        summary["inserted"] += chunk["inserted"]
+        summary["invalid"] += chunk["invalid"]
+        summary["failed_inserts"] += chunk["failed_inserts"]
+    return summary
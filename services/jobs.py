@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from services.cache import TTLCache
+from services.logs import get_logger
+
+logger = get_logger(__name__)
+
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", 3600))
+
+
+class QueueFull(Exception):
+    pass
+
+
+# ✅ Bounded background pool: at most max_workers jobs run and max_queued wait; anything
+# beyond that is rejected at submit time so a burst can't pile up behind the web workers.
+# Job state is mirrored to a Mongo collection so any worker can answer a status poll.
+class JobQueue:
+    def __init__(self, name, max_workers=2, max_queued=20, collection=None, result_ttl=JOB_RESULT_TTL):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.collection = collection
+        self.result_ttl = result_ttl
+        self._jobs = TTLCache(maxsize=10000, ttl=result_ttl)
+        self._events = {}
+        self._slots = threading.BoundedSemaphore(max_workers + max_queued)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+        self.counts = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0, "queued": 0, "running": 0}
+        self.total_wait = 0.0
+        self.total_run = 0.0
+
+    # Threads don't survive fork, so each process starts its own pool on first use
+    def _get_executor(self):
+        pid = os.getpid()
+        with self._lock:
+            if self._executor is None or self._executor_pid != pid:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix=f"{self.name}-job")
+                self._executor_pid = pid
+            return self._executor
+
+    def _count(self, **deltas):
+        with self._lock:
+            for key, delta in deltas.items():
+                self.counts[key] += delta
+
+    def _record(self, job):
+        self._jobs.set(job["_id"], job)
+        if self.collection is None:
+            return
+        try:
+            doc = dict(job, expires_at=datetime.now(timezone.utc) + timedelta(seconds=self.result_ttl))
+            self.collection.replace_one({"_id": job["_id"]}, doc, upsert=True)
+        except Exception as e:
+            logger.error("Job state write error", queue=self.name, error=str(e))
+
+    def submit(self, fn, *args, owner=None, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            self._count(rejected=1)
+            raise QueueFull(f"{self.name} queue is full")
+
+        job_id = uuid.uuid4().hex
+        now = datetime.now(timezone.utc)
+        job = {"_id": job_id, "kind": self.name, "owner": owner, "status": "queued",
+               "result": None, "error": None, "created_at": now, "updated_at": now}
+        self._events[job_id] = threading.Event()
+        self._record(job)
+        self._count(submitted=1, queued=1)
+
+        try:
+            self._get_executor().submit(self._run, job, time.monotonic(), fn, args, kwargs)
+        except Exception:
+            self._slots.release()
+            self._count(queued=-1, rejected=1)
+            self._events.pop(job_id, None)
+            raise
+        return job_id
+
+    def _run(self, job, enqueued_at, fn, args, kwargs):
+        started = time.monotonic()
+        self._count(queued=-1, running=1)
+        with self._lock:
+            self.total_wait += started - enqueued_at
+        job = dict(job, status="running", updated_at=datetime.now(timezone.utc))
+        self._record(job)
+
+        try:
+            job["result"] = fn(*args, **kwargs)
+            job["status"] = "done"
+            self._count(completed=1)
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e) or e.__class__.__name__
+            self._count(failed=1)
+        finally:
+            job["updated_at"] = datetime.now(timezone.utc)
+            self._record(job)
+            self._count(running=-1)
+            with self._lock:
+                self.total_run += time.monotonic() - started
+            self._slots.release()
+            event = self._events.pop(job["_id"], None)
+            if event is not None:
+                event.set()
+
+    def get(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is None and self.collection is not None:
+            job = self.collection.find_one({"_id": job_id}, {"expires_at": 0})
+        return job
+
+    # Long-poll: returns as soon as the job finishes, or after `timeout` seconds. Jobs running
+    # in this process signal an event; jobs owned by another worker are re-read every 0.5s.
+    def wait(self, job_id, timeout):
+        event = self._events.get(job_id)
+        if event is not None:
+            event.wait(timeout)
+            return self.get(job_id)
+
+        deadline = time.monotonic() + timeout
+        job = self.get(job_id)
+        while job and job["status"] in ("queued", "running") and time.monotonic() < deadline:
+            time.sleep(min(0.5, max(0, deadline - time.monotonic())))
+            job = self.get(job_id)
+        return job
+
+    def stats(self):
+        with self._lock:
+            finished = self.counts["completed"] + self.counts["failed"]
+            return dict(
+                self.counts,
+                queue_depth=self.counts["queued"],
+                max_workers=self.max_workers,
+                max_queued=self.max_queued,
+                avg_wait_ms=round(self.total_wait / finished * 1000, 1) if finished else 0,
+                avg_run_ms=round(self.total_run / finished * 1000, 1) if finished else 0,
+            )
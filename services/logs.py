@@ -0,0 +1,203 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+
+from flask import g, has_request_context, request, session
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "json" for production; "text" is easier to read in a terminal
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+# Records waiting for the writer thread; beyond this they're dropped rather than blocking a request
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+# Per-message overrides, e.g. LOG_SAMPLE_RATES="Voice logged=0.1,Food logged=0.05"
+LOG_SAMPLE_RATES = {
+    name.strip(): float(rate)
+    for name, _, rate in (pair.partition("=") for pair in os.getenv("LOG_SAMPLE_RATES", "").split(",") if "=" in pair)
+}
+
+# Field names that are never written out, whatever logs them
+SENSITIVE_KEYS = {"password", "new_password", "old_password", "token", "access_token", "refresh_token",
+                  "secret", "api_key", "authorization", "cookie", "session", "csrf_token", "x-app-key"}
+REDACTED = "[redacted]"
+
+_STANDARD_KWARGS = {"exc_info", "stack_info", "stacklevel", "extra"}
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_stats = {"sampled_out": 0, "dropped": 0}
+_state = {"queue": None, "listener": None, "handler": None, "pid": None}
+_lock = threading.Lock()
+
+
+def redact(value):
+    if isinstance(value, dict):
+        return {k: REDACTED if str(k).lower() in SENSITIVE_KEYS else redact(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(v) for v in value]
+    return value
+
+
+# ✅ One JSON object per line: time, level, logger, message, request context, then fields
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        entry.update(redact(getattr(record, "_fields", {})))
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = redact(getattr(record, "_fields", {}))
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+# Runs on the calling thread, so it's the only place that can see the request
+class RequestContextFilter(logging.Filter):
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = request_id()
+            record.method = request.method
+            record.path = request.path
+            user_id = session.get("user_id") if session else None
+            if user_id:
+                record.user_id = str(user_id)
+        return True
+
+
+# ✅ Formatting and the stdout write happen on the listener thread; the request thread only
+# renders the message and enqueues. A full queue drops the record instead of blocking.
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _stats["dropped"] += 1
+
+
+# ✅ logger.info("Voice logged", user_id=..., items=2, sample_rate=0.1). Keyword arguments become
+# JSON fields; sample_rate keeps roughly that fraction of a high-volume message.
+class StructuredLogger(logging.LoggerAdapter):
+    def log(self, level, msg, *args, sample_rate=None, **kwargs):
+        if not self.isEnabledFor(level):
+            return
+        rate = LOG_SAMPLE_RATES.get(msg, sample_rate)
+        if rate is not None and rate < 1:
+            if random.random() >= rate:
+                _stats["sampled_out"] += 1
+                return
+            kwargs["sample_rate"] = rate
+
+        fields = {k: kwargs.pop(k) for k in list(kwargs) if k not in _STANDARD_KWARGS}
+        extra = dict(kwargs.pop("extra", None) or {}, _fields=fields)
+        kwargs.setdefault("stacklevel", 3)
+        self.logger.log(level, msg, *args, extra=extra, **kwargs)
+
+    def debug(self, msg, *args, **kwargs):
+        self.log(logging.DEBUG, msg, *args, **kwargs)
+
+    def info(self, msg, *args, **kwargs):
+        self.log(logging.INFO, msg, *args, **kwargs)
+
+    def warning(self, msg, *args, **kwargs):
+        self.log(logging.WARNING, msg, *args, **kwargs)
+
+    def error(self, msg, *args, **kwargs):
+        self.log(logging.ERROR, msg, *args, **kwargs)
+
+    def exception(self, msg, *args, **kwargs):
+        kwargs.setdefault("exc_info", True)
+        self.log(logging.ERROR, msg, *args, **kwargs)
+
+
+def get_logger(name):
+    return StructuredLogger(logging.getLogger(name), {})
+
+
+def request_id():
+    if not has_request_context():
+        return None
+    if "request_id" not in g:
+        g.request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    return g.request_id
+
+
+def _start_listener():
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(TextFormatter() if LOG_FORMAT == "text" else JsonFormatter())
+    listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+    listener.start()
+
+    handler = _state["handler"]
+    if handler is None:
+        handler = NonBlockingQueueHandler(log_queue)
+        handler.addFilter(RequestContextFilter())
+        _state["handler"] = handler
+    else:
+        handler.queue = log_queue
+    _state.update(queue=log_queue, listener=listener, pid=os.getpid())
+
+
+def _restart_in_child():
+    # The writer thread doesn't survive fork; give each worker its own
+    if _state["handler"] is not None and _state["pid"] != os.getpid():
+        _state["listener"] = None
+        _start_listener()
+
+
+def _stop():
+    listener = _state["listener"]
+    if listener is not None and _state["pid"] == os.getpid():
+        listener.stop()
+        _state["listener"] = None
+
+
+# ✅ Idempotent: routes every logger through the queue handler on the root logger
+def configure_logging(level=LOG_LEVEL):
+    with _lock:
+        if _state["handler"] is not None:
+            return
+        _start_listener()
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(_state["handler"])
+        root.setLevel(level)
+        atexit.register(_stop)
+        os.register_at_fork(after_in_child=_restart_in_child)
+
+
+def log_stats():
+    log_queue = _state["queue"]
+    return dict(_stats, queued=log_queue.qsize() if log_queue is not None else 0, queue_size=LOG_QUEUE_SIZE)
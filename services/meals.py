@@ -0,0 +1,214 @@
+from datetime import datetime, timezone
+
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from database.db import db
+from services import dashboard_cache, events, notifications
+from services.nutrients import lookup_many, NutritionixError, QuotaExceeded
+from services.timezones import DEFAULT_TZ, custom_timezones, get_tz, local_date, user_timezone
+
+foods = db["foods"]
+daily_totals = db["daily_totals"]
+
+TOTAL_FIELDS = ("calories", "protein", "carbs", "fat")
+
+
+# One $inc per (user, local day) touched, however many meals were written; the day is
+# the calendar day in the meal owner's timezone, read from the profile rather than the
+# per-worker cache so a zone change made on another worker can't file meals under old days
+def _apply_totals(meals, sign):
+    zones = {user_id: user_timezone(user_id, fresh=True) for user_id in {meal["user_id"] for meal in meals}}
+    grouped = {}
+    for meal in meals:
+        key = (meal["user_id"], local_date(meal["timestamp"], zones[meal["user_id"]]))
+        inc = grouped.setdefault(key, dict.fromkeys(TOTAL_FIELDS + ("meals",), 0))
+        for field in TOTAL_FIELDS:
+            inc[field] += sign * (meal.get(field) or 0)
+        inc["meals"] += sign
+
+    now = datetime.now(timezone.utc)
+    ops = [
+        UpdateOne({"user_id": user_id, "date": day}, {"$inc": inc, "$set": {"updated_at": now}}, upsert=True)
+        for (user_id, day), inc in grouped.items()
+    ]
+    if ops:
+        daily_totals.bulk_write(ops, ordered=False)
+
+
+def build_meal(user_id, food, meal_type, timestamp):
+    return {
+        "user_id": user_id,
+        "food_name": food.get("food_name", "Unknown"),
+        "calories": food.get("nf_calories", 0),
+        "protein": food.get("nf_protein", 0),
+        "carbs": food.get("nf_total_carbohydrate", 0),
+        "fat": food.get("nf_total_fat", 0),
+        "meal_type": meal_type,
+        "timestamp": timestamp
+    }
+
+
+# ✅ Every write to `foods` goes through here so the daily rollup, the
+# cached dashboard and open live streams stay in step
+def save_meal(meal):
+    result = foods.insert_one(meal)
+    _apply_totals([meal], 1)
+    dashboard_cache.invalidate(meal["user_id"])
+    notifications.invalidate(meal["user_id"])
+    events.publish_meals("meal_added", [meal])
+    return result.inserted_id
+
+
+# ✅ One unordered insert_many; returns the new _id per meal, None where the insert failed
+def save_meals(meals):
+    if not meals:
+        return []
+
+    failed = set()
+    try:
+        foods.insert_many(meals, ordered=False)
+    except BulkWriteError as e:
+        failed = {error["index"] for error in e.details.get("writeErrors", [])}
+
+    saved = [meal for i, meal in enumerate(meals) if i not in failed]
+    if saved:
+        _apply_totals(saved, 1)
+        for user_id in {meal["user_id"] for meal in saved}:
+            dashboard_cache.invalidate(user_id)
+            notifications.invalidate(user_id)
+        events.publish_meals("meal_added", saved)
+    return [None if i in failed else meal["_id"] for i, meal in enumerate(meals)]
+
+
+def delete_meal(food_id, user_id):
+    meal = foods.find_one_and_delete({"_id": food_id, "user_id": user_id})
+    if meal is None:
+        return None
+    _apply_totals([meal], -1)
+    dashboard_cache.invalidate(user_id)
+    notifications.invalidate(user_id)
+    events.publish_meals("meal_deleted", [meal])
+    return meal
+
+
+# ✅ Shared by /food/log/bulk and /api/voice-log: items are {"query", "meal_type"}.
+# Returns one result per item with status "logged" (and its logs) or "error".
+def log_items(user_id, items, timestamp, tz_name=None):
+    tz_name = tz_name or user_timezone(user_id)
+    lookups = lookup_many([item["query"] for item in items], tz_name, user_id)
+
+    results, meals, owners = [], [], []
+    for item, found in zip(items, lookups):
+        result = {"query": item["query"]}
+        if isinstance(found, NutritionixError):
+            result.update(status="error", error="Failed to fetch food data",
+                          status_code=found.status_code, details=found.details)
+            if isinstance(found, QuotaExceeded):
+                result["retry_after"] = found.retry_after
+        elif not found:
+            result.update(status="error", error="No recognizable food item found.")
+        else:
+            result.update(status="logged", logs=[])
+            for food in found:
+                meals.append(build_meal(user_id, food, item.get("meal_type", "Meal"), timestamp))
+                owners.append(result)
+        results.append(result)
+
+    for meal, owner, meal_id in zip(meals, owners, save_meals(meals)):
+        if meal_id is None:
+            owner["status"] = "error"
+            owner["error"] = "Failed to save food log"
+        else:
+            owner["logs"].append(dict(meal, _id=str(meal_id)))
+    return results
+
+
+def empty_totals(user_id, date):
+    totals = {field: 0 for field in TOTAL_FIELDS}
+    totals.update({"user_id": user_id, "date": date, "meals": 0})
+    return totals
+
+
+# ✅ One small document per (user, local day) instead of scanning the day's meals
+def get_daily_totals(user_id, date, tz_name=None):
+    if isinstance(date, datetime):
+        date = local_date(date, tz_name or user_timezone(user_id))
+    doc = daily_totals.find_one({"user_id": user_id, "date": date}, {"_id": 0, "updated_at": 0})
+    return doc or empty_totals(user_id, date)
+
+
+# --------------------------
+# BACKFILL / RECONCILE
+# --------------------------
+
+def _differs(expected, actual):
+    return any(abs((expected.get(f) or 0) - (actual.get(f) or 0)) > 1e-6 for f in TOTAL_FIELDS + ("meals",))
+
+
+def _expected_totals(match, tz_name):
+    group = {"_id": {
+        "user_id": "$user_id",
+        "date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp", "timezone": tz_name}}
+    }, "meals": {"$sum": 1}}
+    for field in TOTAL_FIELDS:
+        group[field] = {"$sum": f"${field}"}
+
+    expected = {}
+    for row in foods.aggregate([{"$match": match}, {"$group": group}], allowDiskUse=True):
+        key = (row["_id"]["user_id"], row["_id"]["date"])
+        expected[key] = {field: row[field] for field in TOTAL_FIELDS + ("meals",)}
+    return expected
+
+
+# One aggregation per distinct timezone: users on the default zone in one pass, each other
+# zone over just its users. `since` is a local date, so its start differs per zone.
+def rebuild_daily_totals(user_id=None, since=None, tz_name=None, dry_run=False):
+    if user_id:
+        zones = {tz_name or user_timezone(user_id): [user_id]}
+    elif tz_name:
+        zones = {tz_name: None}
+    else:
+        zones = {}
+        for uid, zone in custom_timezones().items():
+            zones.setdefault(zone, []).append(uid)
+        others = [uid for ids in zones.values() for uid in ids]
+        zones[DEFAULT_TZ] = {"$nin": others} if others else None
+
+    scope = {}
+    if user_id:
+        scope["user_id"] = user_id
+    if since:
+        scope["date"] = {"$gte": since}
+
+    expected = {}
+    for zone, ids in zones.items():
+        match = {}
+        if isinstance(ids, list):
+            match["user_id"] = ids[0] if len(ids) == 1 else {"$in": ids}
+        elif ids:
+            match["user_id"] = ids
+        if since:
+            match["timestamp"] = {"$gte": get_tz(zone).localize(datetime.strptime(since, "%Y-%m-%d"))}
+        expected.update(_expected_totals(match, zone))
+
+    existing = {
+        (doc["user_id"], doc["date"]): doc
+        for doc in daily_totals.find(scope, {"_id": 0, "updated_at": 0})
+    }
+
+    drifted = [key for key, totals in expected.items() if key not in existing or _differs(totals, existing[key])]
+    stale = [key for key, doc in existing.items() if key not in expected and doc.get("meals")]
+
+    if not dry_run:
+        now = datetime.now(timezone.utc)
+        ops = [
+            ReplaceOne({"user_id": u, "date": d}, dict(expected[(u, d)], user_id=u, date=d, updated_at=now), upsert=True)
+            for u, d in drifted
+        ]
+        for start in range(0, len(ops), 1000):
+            daily_totals.bulk_write(ops[start:start + 1000], ordered=False)
+        for u, d in stale:
+            daily_totals.delete_one({"user_id": u, "date": d})
+
+    return {"days": len(expected), "drifted": drifted, "stale": stale}
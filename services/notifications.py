@@ -0,0 +1,206 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from bson.objectid import ObjectId
+from dotenv import load_dotenv
+from pymongo import ReplaceOne
+
+from database.db import db
+from services.logs import get_logger
+from services.timezones import DEFAULT_TZ, custom_timezones, day_bounds, local_date, local_now, utc_now
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+notifications = db["notifications"]
+foods = db["foods"]
+users = db["users"]
+
+NOTIFICATION_HOUR = 20  # 8PM local
+NOTIFICATION_TTL_DAYS = 2
+NOTIFICATION_WORKERS = int(os.getenv("NOTIFICATION_WORKERS", os.cpu_count() or 2))
+WRITE_BATCH = 1000
+
+
+def build_message(consumed, goal):
+    if consumed >= goal:
+        return f"🎉 Awesome! You hit your goal of {goal} calories today!"
+    return f"🌟 You’ve consumed {consumed} of {goal} cal. Keep going, you’ve got this!"
+
+
+def notification_id(user_id, day):
+    return f"{user_id}:{day}"
+
+
+def _document(user_id, day, consumed, goal, now):
+    return {
+        "_id": notification_id(user_id, day),
+        "user_id": user_id,
+        "date": day,
+        "consumed": consumed,
+        "goal": goal,
+        "hit_goal": consumed >= goal,
+        "message": build_message(consumed, goal),
+        "computed_at": now,
+        "expires_at": now + timedelta(days=NOTIFICATION_TTL_DAYS),
+    }
+
+
+# --------------------------
+# READ / INVALIDATE (request path)
+# --------------------------
+
+def get_notification(user_id, day):
+    return notifications.find_one({"_id": notification_id(user_id, day)}, {"message": 1, "consumed": 1, "goal": 1})
+
+
+def store_notification(user_id, day, consumed, goal):
+    doc = _document(str(user_id), day, consumed, goal, utc_now())
+    notifications.replace_one({"_id": doc["_id"]}, doc, upsert=True)
+    return doc
+
+
+# ✅ Called on meal writes and goal changes; the next dashboard view recomputes lazily.
+# The anchored prefix regex on _id is answered from the _id index.
+def invalidate(user_id):
+    try:
+        notifications.delete_many({"_id": {"$regex": f"^{user_id}:"}})
+    except Exception as e:
+        logger.error("Notification invalidation error", error=str(e))
+
+
+# --------------------------
+# BATCH JOB
+# --------------------------
+
+# The union of every zone's "today", so one $match covers all users
+def _today_window(now):
+    starts, ends = [], []
+    for zone in set(custom_timezones().values()) | {DEFAULT_TZ}:
+        start, end = day_bounds(zone, local_now(zone).date())
+        starts.append(start)
+        ends.append(end)
+    return min(starts), max(ends)
+
+
+# ✅ One $group over the window's foods per user, joined with users for goal and timezone;
+# each user's meals are then narrowed to their own local day inside the pipeline
+def _pipeline(lo, hi, window_start, window_end, now):
+    user_range = {"$gte": str(lo)}
+    if hi is not None:
+        user_range["$lt"] = str(hi)
+    return [
+        {"$match": {"user_id": user_range, "timestamp": {"$gte": window_start, "$lt": window_end}}},
+        {"$group": {"_id": "$user_id", "meals": {"$push": {"t": "$timestamp", "c": "$calories"}}}},
+        {"$lookup": {
+            "from": "users",
+            "let": {"uid": {"$toObjectId": "$_id"}},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$_id", "$$uid"]}}},
+                {"$project": {"_id": 0, "goal_calories": 1, "timezone": 1}}
+            ],
+            "as": "user"
+        }},
+        {"$unwind": "$user"},
+        {"$set": {"tz": {"$ifNull": ["$user.timezone", DEFAULT_TZ]}}},
+        {"$project": {
+            "goal": {"$ifNull": ["$user.goal_calories", 2000]},
+            "tz": 1,
+            "consumed": {"$sum": {"$map": {
+                "input": {"$filter": {"input": "$meals", "as": "m", "cond": {"$eq": [
+                    {"$dateToString": {"format": "%Y-%m-%d", "date": "$$m.t", "timezone": "$tz"}},
+                    {"$dateToString": {"format": "%Y-%m-%d", "date": now, "timezone": "$tz"}}
+                ]}}},
+                "as": "m",
+                "in": {"$ifNull": ["$$m.c", 0]}
+            }}}
+        }}
+    ]
+
+
+def _flush(ops):
+    if ops:
+        notifications.bulk_write(ops, ordered=False)
+    return []
+
+
+# ✅ Runs in a pool process: every user with _id in [lo, hi). Users who logged nothing
+# today aren't in the aggregation, so they're filled in from the users range afterwards.
+def compute_range(lo, hi, window_start, window_end, now):
+    started = time.perf_counter()
+    ops, seen = [], set()
+
+    for row in foods.aggregate(_pipeline(lo, hi, window_start, window_end, now), allowDiskUse=True):
+        goal = float(row["goal"])
+        day = local_date(now, row["tz"])
+        ops.append(ReplaceOne({"_id": notification_id(row["_id"], day)},
+                              _document(row["_id"], day, round(row["consumed"], 2), goal, now), upsert=True))
+        seen.add(row["_id"])
+        if len(ops) >= WRITE_BATCH:
+            ops = _flush(ops)
+
+    id_range = {"$gte": ObjectId(lo)}
+    if hi is not None:
+        id_range["$lt"] = ObjectId(hi)
+    idle = 0
+    for user in users.find({"_id": id_range}, {"goal_calories": 1, "timezone": 1}):
+        user_id = str(user["_id"])
+        if user_id in seen:
+            continue
+        day = local_date(now, user.get("timezone") or DEFAULT_TZ)
+        ops.append(ReplaceOne({"_id": notification_id(user_id, day)},
+                              _document(user_id, day, 0, float(user.get("goal_calories", 2000)), now), upsert=True))
+        idle += 1
+        if len(ops) >= WRITE_BATCH:
+            ops = _flush(ops)
+    _flush(ops)
+
+    return {"users": len(seen) + idle, "active": len(seen), "seconds": time.perf_counter() - started}
+
+
+# Contiguous _id ranges of roughly equal user counts, as [lo, hi) pairs (hi None = open)
+def user_ranges(buckets):
+    rows = list(users.aggregate([{"$bucketAuto": {"groupBy": "$_id", "buckets": buckets}}]))
+    ranges = []
+    for i, row in enumerate(rows):
+        lo = str(row["_id"]["min"])
+        hi = str(rows[i + 1]["_id"]["min"]) if i + 1 < len(rows) else None
+        ranges.append((lo, hi))
+    return ranges
+
+
+def _compute_range_worker(args):
+    return compute_range(*args)
+
+
+# ✅ Splits users into ranges with $bucketAuto and computes them on a process pool. Workers
+# are spawned, not forked, so none of them inherits this process's Mongo client or threads.
+def run_notification_job(workers=NOTIFICATION_WORKERS, buckets=None):
+    started = time.perf_counter()
+    now = utc_now()
+    window_start, window_end = _today_window(now)
+    ranges = user_ranges(buckets or workers * 4)
+    tasks = [(lo, hi, window_start, window_end, now) for lo, hi in ranges]
+
+    if workers <= 1 or len(tasks) <= 1:
+        results = [compute_range(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = list(pool.map(_compute_range_worker, tasks))
+
+    elapsed = time.perf_counter() - started
+    total = sum(r["users"] for r in results)
+    summary = {
+        "users": total,
+        "active_today": sum(r["active"] for r in results),
+        "ranges": len(ranges),
+        "workers": workers,
+        "seconds": round(elapsed, 2),
+        "users_per_sec": round(total / elapsed, 1) if elapsed else None,
+    }
+    logger.info("Notification job finished", **summary)
+    return summary
@@ -0,0 +1,189 @@
+import os
+import re
+from datetime import datetime, timedelta, timezone
+
+from dotenv import load_dotenv
+
+from database.db import db
+from services.cache import TTLCache
+from services import food_index
+from services.singleflight import SingleFlight
+from services.logs import get_logger
+from services.nutritionix import client, NutritionixError, QuotaExceeded
+
+logger = get_logger(__name__)
+
+load_dotenv()
+
+# Cache sizing (entries are whole Nutritionix "foods" lists for one phrase)
+CACHE_SIZE = int(os.getenv("NUTRIENT_CACHE_SIZE", 2048))
+CACHE_TTL = int(os.getenv("NUTRIENT_CACHE_TTL", 24 * 3600))
+CACHE_PERSIST = os.getenv("NUTRIENT_CACHE_PERSIST", "false").lower() in ("1", "true", "yes")
+
+nutrient_cache = TTLCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL)
+cached_nutrients = db["nutrient_cache"]
+
+# Identical lookups that miss the cache at the same moment share one upstream call
+nutrient_flight = SingleFlight()
+
+_persist_stats = {"hits": 0, "misses": 0, "writes": 0, "errors": 0}
+_batch_stats = {"batched_calls": 0, "batched_items": 0, "unmapped_batches": 0}
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s.,;:!?]+$")
+
+
+# ✅ "  2 Rotis. " and "2 rotis" are the same lookup
+def normalize_query(query):
+    query = _WHITESPACE.sub(" ", (query or "").strip().lower())
+    return _TRAILING_PUNCTUATION.sub("", query)
+
+
+def _load_persisted(key):
+    try:
+        doc = cached_nutrients.find_one({"_id": key, "expires_at": {"$gt": datetime.now(timezone.utc)}})
+    except Exception as e:
+        logger.error("Nutrient cache read error", error=str(e))
+        _persist_stats["errors"] += 1
+        return None
+
+    if doc is None:
+        _persist_stats["misses"] += 1
+        return None
+    _persist_stats["hits"] += 1
+    return doc["foods"]
+
+
+def _store_persisted(key, foods_list):
+    try:
+        cached_nutrients.replace_one(
+            {"_id": key},
+            {"_id": key, "foods": foods_list, "expires_at": datetime.now(timezone.utc) + timedelta(seconds=CACHE_TTL)},
+            upsert=True
+        )
+        _persist_stats["writes"] += 1
+    except Exception as e:
+        logger.error("Nutrient cache write error", error=str(e))
+        _persist_stats["errors"] += 1
+
+
+def _resolve_nutrients(key, tz_name):
+    # Another caller may have just filled the cache while we waited to lead
+    foods_list = nutrient_cache.get(key)
+    if foods_list is not None:
+        return foods_list
+
+    foods_list = client.natural_nutrients(key, tz_name)
+    if foods_list:
+        _remember(key, foods_list)
+    return foods_list
+
+
+def _remember(key, foods_list):
+    nutrient_cache.set(key, foods_list)
+    if CACHE_PERSIST:
+        _store_persisted(key, foods_list)
+    food_index.learn(foods_list)
+
+
+# Nutritionix may split one phrase into two foods and drop another, so equal counts prove
+# nothing; each food's item tag (or name) has to come from the phrase it is paired with
+def _answers_phrase(key, food):
+    words = set(food_index.normalize_name(key).split())
+    for name in ((food.get("tags") or {}).get("item"), food.get("food_name")):
+        name_words = food_index.normalize_name(name).split()
+        if name_words and set(name_words) <= words:
+            return True
+    return False
+
+
+# Everything short of Nutritionix: memory cache, local index, then the persisted cache.
+# Only a miss here spends quota.
+def _resolve_without_upstream(key):
+    foods_list = nutrient_cache.get(key)
+    if foods_list is None:
+        foods_list = food_index.resolve_locally(key)
+    if foods_list is None and CACHE_PERSIST:
+        foods_list = _load_persisted(key)
+        if foods_list is not None:
+            nutrient_cache.set(key, foods_list)
+    return foods_list
+
+
+# ✅ Shared lookup used by /food/log, /food/manual, /food/image and /api/voice-log.
+# Returns the Nutritionix "foods" list; callers must treat it as read-only. user_id is
+# whose quota an upstream call spends (defaults to the signed-in user of the request).
+def lookup_nutrients(query, tz_name="Asia/Kolkata", user_id=None):
+    key = normalize_query(query)
+
+    # Cache first, then the local index (exact names and near-exact fuzzy matches only);
+    # everything else goes upstream
+    foods_list = _resolve_without_upstream(key)
+    if foods_list is not None:
+        return foods_list
+
+    with client.user_quota(user_id):
+        return nutrient_flight.do(key, _resolve_nutrients, key, tz_name)
+
+
+# ✅ Resolve many phrases with as few upstream calls as possible. Single-item phrases that
+# miss locally go to Nutritionix as one multi-item query; unless every food in its answer
+# maps back to its own phrase, those phrases fall back to individual lookups.
+# Returns one entry per query: a "foods" list, or the NutritionixError it failed with.
+def lookup_many(queries, tz_name="Asia/Kolkata", user_id=None):
+    keys = [normalize_query(q) for q in queries]
+    resolved, pending = {}, []
+    for key in dict.fromkeys(keys):
+        foods_list = _resolve_without_upstream(key)
+        if foods_list is not None:
+            resolved[key] = foods_list
+        else:
+            pending.append(key)
+
+    batchable = [key for key in pending if len(food_index.split_items(key)) == 1]
+    if len(batchable) > 1:
+        combined_query = ", ".join(batchable)
+        try:
+            with client.user_quota(user_id):
+                combined = nutrient_flight.do(combined_query, client.natural_nutrients, combined_query, tz_name)
+        except QuotaExceeded as e:
+            # Retrying phrase by phrase would only be refused again
+            for key in pending:
+                resolved[key] = e
+            combined = None
+        except NutritionixError:
+            combined = None
+        if combined and len(combined) == len(batchable) and all(map(_answers_phrase, batchable, combined)):
+            _batch_stats["batched_calls"] += 1
+            _batch_stats["batched_items"] += len(batchable)
+            for key, food in zip(batchable, combined):
+                resolved[key] = [food]
+                _remember(key, [food])
+        else:
+            _batch_stats["unmapped_batches"] += 1
+
+    for key in pending:
+        if key in resolved:
+            continue
+        try:
+            resolved[key] = lookup_nutrients(key, tz_name, user_id)
+        except NutritionixError as e:
+            resolved[key] = e
+
+    return [resolved[key] for key in keys]
+
+
+def cache_stats():
+    stats = nutrient_cache.stats()
+    if CACHE_PERSIST:
+        stats["persistent"] = dict(_persist_stats)
+    return stats
+
+
+def flight_stats():
+    return nutrient_flight.stats()
+
+
+def batch_stats():
+    return dict(_batch_stats)
+
@@ -0,0 +1,262 @@
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+from services.metrics import Histogram
+from services.quota import limiter as quota_limiter, current_user_id
+
+load_dotenv()
+
+# Nutritionix Setup
+NUTRITIONIX_BASE_URL = os.getenv("NUTRITIONIX_BASE_URL", "https://trackapi.nutritionix.com").rstrip("/")
+NUTRITIONIX_APP_ID = os.getenv("NUTRITIONIX_APP_ID")
+NUTRITIONIX_API_KEY = os.getenv("NUTRITIONIX_API_KEY")
+
+# One pooled connection per worker thread that can be talking to Nutritionix at once
+POOL_SIZE = int(os.getenv("NUTRITIONIX_POOL_SIZE", os.getenv("WEB_THREADS", 10)))
+CONNECT_TIMEOUT = float(os.getenv("NUTRITIONIX_CONNECT_TIMEOUT", 3.05))
+READ_TIMEOUT = float(os.getenv("NUTRITIONIX_READ_TIMEOUT", 10))
+MAX_RETRIES = int(os.getenv("NUTRITIONIX_MAX_RETRIES", 2))
+RETRY_BACKOFF = float(os.getenv("NUTRITIONIX_RETRY_BACKOFF", 0.25))
+RETRY_BACKOFF_MAX = float(os.getenv("NUTRITIONIX_RETRY_BACKOFF_MAX", 2))
+RETRY_DEADLINE = float(os.getenv("NUTRITIONIX_RETRY_DEADLINE", 15))
+BREAKER_THRESHOLD = int(os.getenv("NUTRITIONIX_BREAKER_THRESHOLD", 5))
+BREAKER_RESET = float(os.getenv("NUTRITIONIX_BREAKER_RESET", 30))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# One observation per attempt, so retries show up as their own samples
+NUTRITIONIX_LATENCY = Histogram(
+    "nutritionix_request_duration_seconds", "Outbound Nutritionix calls, by endpoint and status.",
+    ("endpoint", "status")
+)
+
+
+class NutritionixError(Exception):
+    def __init__(self, status_code, details=""):
+        super().__init__(f"Nutritionix returned {status_code}")
+        self.status_code = status_code
+        self.details = details
+
+
+# Raised without contacting Nutritionix (circuit open) or after every attempt failed on the network
+class NutritionixUnavailable(NutritionixError):
+    def __init__(self, details=""):
+        super().__init__(503, details)
+
+
+# Raised without contacting Nutritionix: the caller's bucket or the app-wide quota is empty
+class QuotaExceeded(NutritionixError):
+    def __init__(self, retry_after, scope):
+        super().__init__(429, f"Nutritionix {scope} quota exhausted, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+        self.scope = scope
+
+
+# ✅ Opens after N consecutive failed calls, lets one trial call through after the reset window
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.short_circuited = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            self.short_circuited += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+    # The allowed call never reached Nutritionix: free the half-open slot without a verdict
+    def release(self):
+        with self._lock:
+            self.trial_in_flight = False
+
+
+class NutritionixClient:
+    def __init__(self, base_url=NUTRITIONIX_BASE_URL, app_id=NUTRITIONIX_APP_ID, api_key=NUTRITIONIX_API_KEY,
+                 pool_size=POOL_SIZE, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), max_retries=MAX_RETRIES,
+                 backoff=RETRY_BACKOFF, backoff_max=RETRY_BACKOFF_MAX, deadline=RETRY_DEADLINE,
+                 breaker=None, limiter=None):
+        self.base_url = base_url.rstrip("/")
+        self.headers = {
+            "x-app-id": app_id,
+            "x-app-key": api_key,
+            "Content-Type": "application/json"
+        }
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.deadline = deadline
+        self.breaker = breaker or CircuitBreaker(BREAKER_THRESHOLD, BREAKER_RESET)
+        self.limiter = limiter
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self._session = None
+        self._session_pid = None
+        self._session_lock = threading.Lock()
+
+    # Sessions hold sockets, so each (forked) process builds its own on first use
+    @property
+    def session(self):
+        pid = os.getpid()
+        if self._session is None or self._session_pid != pid:
+            with self._session_lock:
+                if self._session is None or self._session_pid != pid:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    session.headers.update(self.headers)
+                    self._session = session
+                    self._session_pid = pid
+        return self._session
+
+    def _sleep_before_retry(self, attempt, started):
+        # Full jitter, and never sleep past the overall deadline
+        delay = random.uniform(0, min(self.backoff_max, self.backoff * (2 ** attempt)))
+        if time.monotonic() - started + delay >= self.deadline:
+            return False
+        time.sleep(delay)
+        return True
+
+    def request(self, method, path, **kwargs):
+        if not self.breaker.allow():
+            raise NutritionixUnavailable("Nutritionix circuit breaker is open")
+
+        kwargs.setdefault("timeout", self.timeout)
+        url = f"{self.base_url}{path}"
+        started = time.monotonic()
+        attempt = 0
+        self.calls += 1
+        attempted = settled = False
+
+        # Whatever ends the call (a quota refusal, an unexpected requests error) must settle
+        # the breaker, or a half-open trial stays in flight and the breaker never closes
+        try:
+            while True:
+                # Every attempt (retries too) spends a global token; users pay in user_quota()
+                if self.limiter is not None:
+                    granted, retry_after = self.limiter.acquire_global()
+                    if not granted:
+                        raise QuotaExceeded(retry_after, "global")
+
+                error = None
+                attempted = True
+                attempt_started = time.perf_counter()
+                try:
+                    res = self.session.request(method, url, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    res, error = None, e
+                status = "timeout" if isinstance(error, requests.Timeout) else "connection_error" if error else str(res.status_code)
+                NUTRITIONIX_LATENCY.observe(time.perf_counter() - attempt_started, path, status)
+
+                retryable = error is not None or res.status_code in RETRY_STATUSES
+                if not retryable:
+                    self.breaker.record_success()
+                    settled = True
+                    return res
+
+                if attempt >= self.max_retries or not self._sleep_before_retry(attempt, started):
+                    self.failures += 1
+                    self.breaker.record_failure()
+                    settled = True
+                    if error is not None:
+                        raise NutritionixUnavailable(str(error))
+                    return res
+
+                attempt += 1
+                self.retries += 1
+        finally:
+            if not settled:
+                if attempted:
+                    self.failures += 1
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.release()
+
+    # ✅ Wraps a lookup that may go upstream, outside any single-flight: the caller's own bucket
+    # pays, so a shared call only ever fails everyone for the global quota
+    @contextmanager
+    def user_quota(self, user_id=None):
+        user_id = user_id or current_user_id()
+        if self.limiter is None or not user_id:
+            yield
+            return
+
+        granted, retry_after = self.limiter.acquire_user(user_id)
+        if not granted:
+            raise QuotaExceeded(retry_after, "user")
+        try:
+            yield
+        except QuotaExceeded:
+            self.limiter.refund_user(user_id)
+            raise
+
+    def natural_nutrients(self, query, tz_name=None):
+        payload = {"query": query}
+        if tz_name:
+            payload["timezone"] = tz_name
+
+        res = self.request("POST", "/v2/natural/nutrients", json=payload)
+        if res.status_code != 200:
+            raise NutritionixError(res.status_code, res.text)
+        return res.json().get("foods", [])
+
+    def search_item(self, upc):
+        res = self.request("GET", "/v2/search/item", params={"upc": upc})
+        if res.status_code != 200:
+            raise NutritionixError(res.status_code, res.text)
+        return res.json().get("foods", [])
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "breaker_state": self.breaker.state,
+            "short_circuited": self.breaker.short_circuited,
+            "pool_size": self.pool_size,
+        }
+
+
+# Shared by every blueprint
+client = NutritionixClient(limiter=quota_limiter)
@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Werkzeug method string, e.g. "scrypt:32768:8:1" (werkzeug's default) or "pbkdf2:sha256:600000".
+# Raising it makes every login slower, so size PASSWORD_HASH_WORKERS with it.
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+# hashlib's scrypt/pbkdf2 release the GIL, so a thread per core hashes in parallel
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 2))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", 32))
+# How long a request may wait for a queue slot before it's turned away
+PASSWORD_HASH_WAIT = float(os.getenv("PASSWORD_HASH_WAIT", 2))
+
+
+class HashPoolBusy(Exception):
+    pass
+
+
+def _method_prefix(method):
+    # Werkzeug fills in default parameters ("scrypt" -> "scrypt:32768:8:1"), so compare
+    # against what it actually writes rather than the configured string
+    return generate_password_hash("", method=method).split("$", 1)[0]
+
+
+# ✅ Password hashing off the request path: at most `workers` hashes run at once and `queued`
+# wait; a login that can't get a slot within `wait` seconds fails fast instead of piling up
+class HashPool:
+    def __init__(self, workers=PASSWORD_HASH_WORKERS, queued=PASSWORD_HASH_QUEUE,
+                 wait=PASSWORD_HASH_WAIT, method=PASSWORD_HASH_METHOD):
+        self.workers = workers
+        self.queued = queued
+        self.wait = wait
+        self.method = method
+        self._prefix = None
+        self._slots = threading.BoundedSemaphore(workers + queued)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+        self.counts = {"hashed": 0, "verified": 0, "rehashed": 0, "rejected": 0, "in_flight": 0}
+        self.total_wait = 0.0
+        self.total_run = 0.0
+
+    # Threads don't survive fork, so each process starts its own pool on first use
+    def _get_executor(self):
+        pid = os.getpid()
+        with self._lock:
+            if self._executor is None or self._executor_pid != pid:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hash")
+                self._executor_pid = pid
+            return self._executor
+
+    def _count(self, **deltas):
+        with self._lock:
+            for key, delta in deltas.items():
+                self.counts[key] += delta
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.wait):
+            self._count(rejected=1)
+            raise HashPoolBusy("Too many logins in progress")
+
+        enqueued = time.monotonic()
+        self._count(in_flight=1)
+
+        def timed():
+            started = time.monotonic()
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self.total_wait += started - enqueued
+                    self.total_run += time.monotonic() - started
+
+        try:
+            return self._get_executor().submit(timed).result()
+        finally:
+            self._count(in_flight=-1)
+            self._slots.release()
+
+    def needs_rehash(self, stored_hash):
+        if self._prefix is None:
+            self._prefix = _method_prefix(self.method)
+        return stored_hash.split("$", 1)[0] != self._prefix
+
+    def hash(self, password):
+        hashed = self._run(generate_password_hash, password, self.method)
+        self._count(hashed=1)
+        return hashed
+
+    # Returns (ok, new_hash); new_hash is set when the stored hash used an older method/cost
+    def verify(self, stored_hash, password):
+        def check():
+            if not check_password_hash(stored_hash, password):
+                return False, None
+            if not self.needs_rehash(stored_hash):
+                return True, None
+            return True, generate_password_hash(password, self.method)
+
+        ok, new_hash = self._run(check)
+        self._count(verified=1, rehashed=1 if new_hash else 0)
+        return ok, new_hash
+
+    def stats(self):
+        with self._lock:
+            done = self.counts["hashed"] + self.counts["verified"]
+            return dict(
+                self.counts,
+                method=self.method,
+                workers=self.workers,
+                max_queued=self.queued,
+                avg_wait_ms=round(self.total_wait / done * 1000, 1) if done else 0,
+                avg_run_ms=round(self.total_run / done * 1000, 1) if done else 0,
+            )
+
+
+hash_pool = HashPool()
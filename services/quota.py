@@ -0,0 +1,252 @@
+import math
+import os
+import threading
+import time
+from datetime import timedelta
+
+from dotenv import load_dotenv
+from flask import has_request_context, session
+from pymongo import ReturnDocument
+
+from database.db import db
+from services.cache import TTLCache
+from services.logs import get_logger
+from services.timezones import utc_now
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+# "memory" buckets belong to one process, so with N workers the fleet may spend N times the
+# global quota; "mongo" keeps every bucket in upstream_quota, shared by every worker and node
+QUOTA_BACKEND = os.getenv("NUTRITIONIX_QUOTA_BACKEND", "memory").lower()
+# The global bucket refills at DAILY_QUOTA per day and holds at most GLOBAL_BURST calls (0 = no global limit)
+DAILY_QUOTA = int(os.getenv("NUTRITIONIX_DAILY_QUOTA", 10000))
+GLOBAL_BURST = int(os.getenv("NUTRITIONIX_GLOBAL_BURST", 100))
+# Each user's bucket: USER_BURST calls at once, refilled at USER_PER_MINUTE (0 = no per-user limit)
+USER_PER_MINUTE = float(os.getenv("NUTRITIONIX_USER_PER_MINUTE", 10))
+USER_BURST = int(os.getenv("NUTRITIONIX_USER_BURST", 20))
+USER_BUCKETS = int(os.getenv("NUTRITIONIX_USER_BUCKETS", 10000))
+
+upstream_quota = db["upstream_quota"]
+
+
+class Limit:
+    def __init__(self, name, capacity, per_second):
+        self.name = name
+        self.capacity = capacity
+        self.per_second = per_second
+
+    @property
+    def enabled(self):
+        return self.capacity > 0 and self.per_second > 0
+
+    # An untouched bucket is full again after this long, so forgetting it loses nothing
+    @property
+    def refill_seconds(self):
+        return self.capacity / self.per_second
+
+    def retry_after(self, tokens, cost=1):
+        return max(cost - tokens, 0) / self.per_second
+
+    def describe(self, tokens):
+        return {
+            "remaining": math.floor(tokens),
+            "capacity": self.capacity,
+            "refill_per_minute": round(self.per_second * 60, 3),
+            "full_in_seconds": round((self.capacity - tokens) / self.per_second, 1),
+        }
+
+
+# ✅ Classic token bucket: refills continuously up to capacity, a call spends one token
+class TokenBucket:
+    def __init__(self, limit):
+        self.limit = limit
+        self.tokens = float(limit.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.limit.capacity, self.tokens + (now - self.updated) * self.limit.per_second)
+        self.updated = now
+
+    def take(self, cost=1):
+        self._refill()
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True, self.tokens
+        return False, self.tokens
+
+    def give(self, cost=1):
+        self._refill()
+        self.tokens = min(self.limit.capacity, self.tokens + cost)
+
+    def peek(self):
+        self._refill()
+        return self.tokens
+
+
+class MemoryQuotaStore:
+    name = "memory"
+
+    def __init__(self, max_buckets=USER_BUCKETS, idle_ttl=3600):
+        self._buckets = TTLCache(maxsize=max_buckets, ttl=idle_ttl)
+        self._lock = threading.Lock()
+
+    def _bucket(self, key, limit):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(limit)
+        self._buckets.set(key, bucket, ttl=limit.refill_seconds)
+        return bucket
+
+    def take(self, key, limit, cost=1):
+        with self._lock:
+            return self._bucket(key, limit).take(cost)
+
+    def give(self, key, limit, cost=1):
+        with self._lock:
+            self._bucket(key, limit).give(cost)
+
+    def peek(self, key, limit):
+        with self._lock:
+            return self._bucket(key, limit).peek()
+
+    def stats(self):
+        return {"buckets": len(self._buckets)}
+
+
+# ✅ The same bucket as one document, refilled and spent in a single atomic update using the
+# server's clock ($$NOW), so concurrent workers can't both spend the last token
+class MongoQuotaStore:
+    name = "mongo"
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    @staticmethod
+    def _refilled(limit):
+        elapsed = {"$divide": [{"$subtract": ["$$NOW", {"$ifNull": ["$updated_at", "$$NOW"]}]}, 1000]}
+        return {"$min": [limit.capacity, {"$add": [
+            {"$ifNull": ["$tokens", limit.capacity]}, {"$multiply": [elapsed, limit.per_second]}
+        ]}]}
+
+    def _update(self, key, limit, stages):
+        expires_at = utc_now() + timedelta(seconds=limit.refill_seconds)
+        return self.collection.find_one_and_update(
+            {"_id": key},
+            [{"$set": {"tokens": self._refilled(limit), "updated_at": "$$NOW", "expires_at": expires_at}}] + stages,
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+
+    def take(self, key, limit, cost=1):
+        doc = self._update(key, limit, [
+            {"$set": {"granted": {"$gte": ["$tokens", cost]}}},
+            {"$set": {"tokens": {"$cond": ["$granted", {"$subtract": ["$tokens", cost]}, "$tokens"]}}},
+        ])
+        return doc["granted"], doc["tokens"]
+
+    def give(self, key, limit, cost=1):
+        self._update(key, limit, [{"$set": {"tokens": {"$min": [limit.capacity, {"$add": ["$tokens", cost]}]}}}])
+
+    def peek(self, key, limit):
+        doc = self.collection.find_one({"_id": key}, {"tokens": 1, "updated_at": 1})
+        if doc is None:
+            return float(limit.capacity)
+        elapsed = (utc_now().replace(tzinfo=None) - doc["updated_at"].replace(tzinfo=None)).total_seconds()
+        return min(limit.capacity, doc["tokens"] + max(elapsed, 0) * limit.per_second)
+
+    def stats(self):
+        return {}
+
+
+# ✅ Two scopes, charged at different points: a lookup spends one token of its user's bucket
+# before it can join a shared (single-flight) call, and every upstream attempt spends one
+# global token. If the shared store is unreachable, the per-process buckets take over.
+class QuotaLimiter:
+    def __init__(self, store, user_limit, global_limit):
+        self.store = store
+        self.fallback = store if isinstance(store, MemoryQuotaStore) else MemoryQuotaStore()
+        self.user_limit = user_limit
+        self.global_limit = global_limit
+        self.counts = {"granted": 0, "denied_user": 0, "denied_global": 0, "store_errors": 0}
+
+    def _call(self, method, *args):
+        if self.store is not self.fallback:
+            try:
+                return getattr(self.store, method)(*args)
+            except Exception as e:
+                logger.error("Quota store error", error=str(e), sample_rate=0.1)
+                self.counts["store_errors"] += 1
+        return getattr(self.fallback, method)(*args)
+
+    # Both return (granted, retry_after_seconds)
+    def acquire_user(self, user_id, cost=1):
+        if not user_id or not self.user_limit.enabled:
+            return True, 0.0
+        granted, tokens = self._call("take", f"user:{user_id}", self.user_limit, cost)
+        if not granted:
+            self.counts["denied_user"] += 1
+            return False, self.user_limit.retry_after(tokens, cost)
+        return True, 0.0
+
+    def acquire_global(self, cost=1):
+        if self.global_limit.enabled:
+            granted, tokens = self._call("take", "global", self.global_limit, cost)
+            if not granted:
+                self.counts["denied_global"] += 1
+                return False, self.global_limit.retry_after(tokens, cost)
+        self.counts["granted"] += 1
+        return True, 0.0
+
+    # The lookup was refused globally, so the user's token bought nothing
+    def refund_user(self, user_id, cost=1):
+        if user_id and self.user_limit.enabled:
+            self._call("give", f"user:{user_id}", self.user_limit, cost)
+
+    def remaining(self, user_id=None):
+        remaining = {}
+        if self.global_limit.enabled:
+            remaining["global"] = self.global_limit.describe(self._call("peek", "global", self.global_limit))
+        if user_id and self.user_limit.enabled:
+            remaining["user"] = self.user_limit.describe(self._call("peek", f"user:{user_id}", self.user_limit))
+        return remaining
+
+    def stats(self):
+        stats = dict(self.counts, backend=self.store.name)
+        stats.update(self.fallback.stats())
+        try:
+            stats["remaining"] = self.remaining()
+        except Exception as e:
+            stats["remaining"] = {"error": str(e)}
+        return stats
+
+
+def _make_store(name):
+    if name == "mongo":
+        return MongoQuotaStore(upstream_quota)
+    return MemoryQuotaStore()
+
+
+limiter = QuotaLimiter(
+    _make_store(QUOTA_BACKEND),
+    Limit("user", USER_BURST, USER_PER_MINUTE / 60),
+    Limit("global", GLOBAL_BURST, DAILY_QUOTA / 86400)
+)
+
+
+# The signed-in user behind the current request; background jobs only spend the global bucket
+def current_user_id():
+    if has_request_context() and session:
+        user_id = session.get("user_id")
+        return str(user_id) if user_id else None
+    return None
+
+
+def retry_after_header(seconds):
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+
+def quota_stats():
+    return limiter.stats()
@@ -0,0 +1,5 @@
+# ✅ Food recognition for uploaded photos (raw image bytes in, food phrase out).
+# 🚧 Simulated for now (later integrate real model) — this is the slow step the image
+# job queue and the content-hash cache exist for.
+def recognize_food(image_bytes):
+    return "apple"
@@ -0,0 +1,109 @@
+import os
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+import pytz
+from bson.objectid import ObjectId
+from dotenv import load_dotenv
+
+from database.db import db
+from services.cache import TTLCache
+from services.logs import get_logger
+
+logger = get_logger(__name__)
+
+load_dotenv()
+
+# Used for users who never picked a timezone (everyone signed up before the setting existed)
+DEFAULT_TZ = os.getenv("DEFAULT_TIMEZONE", "Asia/Kolkata")
+# Profile edits evict locally; other workers pick up a change within this many seconds
+USER_TZ_CACHE_TTL = int(os.getenv("USER_TZ_CACHE_TTL", 300))
+
+users = db["users"]
+_user_tz = TTLCache(maxsize=int(os.getenv("USER_TZ_CACHE_SIZE", 10000)), ttl=USER_TZ_CACHE_TTL)
+
+
+def is_valid_timezone(name):
+    return name in pytz.all_timezones_set
+
+
+@lru_cache(maxsize=None)
+def get_tz(name):
+    try:
+        return pytz.timezone(name or DEFAULT_TZ)
+    except pytz.UnknownTimeZoneError:
+        return pytz.timezone(DEFAULT_TZ)
+
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+
+def local_now(tz_name):
+    return utc_now().astimezone(get_tz(tz_name))
+
+
+# Mongo hands back naive UTC datetimes; everything we write is aware UTC
+def to_local(ts, tz_name):
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(get_tz(tz_name))
+
+
+def local_date(ts, tz_name):
+    return to_local(ts, tz_name).strftime("%Y-%m-%d")
+
+
+# ✅ [start, end) of a local calendar day as UTC instants. Days aren't always 24h (DST),
+# so each boundary is localized separately; results are cached per (tz, date).
+@lru_cache(maxsize=4096)
+def day_bounds(tz_name, day):
+    tz = get_tz(tz_name)
+    start = tz.localize(datetime(day.year, day.month, day.day))
+    following = day + timedelta(days=1)
+    end = tz.localize(datetime(following.year, following.month, following.day))
+    return start.astimezone(timezone.utc), end.astimezone(timezone.utc)
+
+
+def local_midnight(tz_name, day):
+    return day_bounds(tz_name, day)[0]
+
+
+# Returns (local date, start, end) for "today" in tz_name
+def today_bounds(tz_name):
+    today = local_now(tz_name).date()
+    start, end = day_bounds(tz_name, today)
+    return today, start, end
+
+
+# ✅ The user's IANA timezone from their profile, cached for USER_TZ_CACHE_TTL. fresh=True
+# skips this worker's cache (another worker may have just handled a timezone change).
+def user_timezone(user_id, fresh=False):
+    user_id = str(user_id)
+    tz_name = None if fresh else _user_tz.get(user_id)
+    if tz_name is not None:
+        return tz_name
+
+    tz_name = DEFAULT_TZ
+    try:
+        user = users.find_one({"_id": ObjectId(user_id)}, {"timezone": 1})
+        if user and is_valid_timezone(user.get("timezone")):
+            tz_name = user["timezone"]
+    except Exception as e:
+        logger.error("User timezone lookup error", error=str(e))
+        return tz_name
+    _user_tz.set(user_id, tz_name)
+    return tz_name
+
+
+def forget_user_timezone(user_id):
+    _user_tz.pop(str(user_id))
+
+
+# user_id -> tz_name for every user with a non-default setting (for batch jobs)
+def custom_timezones():
+    return {
+        str(user["_id"]): user["timezone"]
+        for user in users.find({"timezone": {"$exists": True, "$ne": DEFAULT_TZ}}, {"timezone": 1})
+        if is_valid_timezone(user.get("timezone"))
+    }
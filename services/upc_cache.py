@@ -0,0 +1,106 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+from dotenv import load_dotenv
+from pymongo.errors import DuplicateKeyError
+
+from database.db import db
+from services.cache import TTLCache
+from services.logs import get_logger
+from services.nutritionix import client, NutritionixError
+from services.singleflight import SingleFlight
+
+logger = get_logger(__name__)
+
+load_dotenv()
+
+# Products rarely change, but "not found" codes do get added to Nutritionix eventually
+UPC_CACHE_SIZE = int(os.getenv("UPC_CACHE_SIZE", 4096))
+UPC_CACHE_TTL = int(os.getenv("UPC_CACHE_TTL", 30 * 24 * 3600))
+UPC_NEGATIVE_TTL = int(os.getenv("UPC_NEGATIVE_TTL", 24 * 3600))
+
+upc_cache = TTLCache(maxsize=UPC_CACHE_SIZE, ttl=UPC_CACHE_TTL)
+upc_docs = db["upc_cache"]
+upc_flight = SingleFlight()
+
+_store_stats = {"hits": 0, "negative_hits": 0, "misses": 0, "errors": 0}
+
+
+def _load(upc):
+    try:
+        doc = upc_docs.find_one({"upc": upc, "expires_at": {"$gt": datetime.now(timezone.utc)}})
+    except Exception as e:
+        logger.error("UPC cache read error", error=str(e))
+        _store_stats["errors"] += 1
+        return None
+
+    if doc is None:
+        _store_stats["misses"] += 1
+        return None
+
+    foods_list = doc.get("foods", [])
+    _store_stats["hits" if foods_list else "negative_hits"] += 1
+    # Don't let the in-process copy outlive the Mongo entry
+    remaining = (doc["expires_at"].replace(tzinfo=timezone.utc) - datetime.now(timezone.utc)).total_seconds()
+    upc_cache.set(upc, foods_list, ttl=max(1, min(remaining, UPC_CACHE_TTL)))
+    return foods_list
+
+
+def _store(upc, foods_list):
+    ttl = UPC_CACHE_TTL if foods_list else UPC_NEGATIVE_TTL
+    upc_cache.set(upc, foods_list, ttl=ttl)
+    try:
+        upc_docs.update_one(
+            {"upc": upc},
+            {"$set": {
+                "foods": foods_list,
+                "found": bool(foods_list),
+                "expires_at": datetime.now(timezone.utc) + timedelta(seconds=ttl)
+            }},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        pass  # another worker stored it first
+    except Exception as e:
+        logger.error("UPC cache write error", error=str(e))
+        _store_stats["errors"] += 1
+
+
+def _fetch(upc):
+    # Another caller may have just filled the cache while we waited to lead
+    foods_list = upc_cache.get(upc)
+    if foods_list is not None:
+        return foods_list
+
+    try:
+        foods_list = client.search_item(upc)
+    except NutritionixError as e:
+        if e.status_code != 404:
+            raise
+        foods_list = []
+
+    _store(upc, foods_list)
+    return foods_list
+
+
+# ✅ Barcode lookup: [] means Nutritionix doesn't know the code (cached for UPC_NEGATIVE_TTL).
+# Only a miss in both caches goes upstream and spends the user's quota.
+def lookup_upc(upc, user_id=None):
+    upc = str(upc).strip()
+
+    foods_list = upc_cache.get(upc)
+    if foods_list is None:
+        foods_list = _load(upc)
+    if foods_list is not None:
+        return foods_list
+
+    with client.user_quota(user_id):
+        return upc_flight.do(upc, _fetch, upc)
+
+
+def upc_stats():
+    stats = upc_cache.stats()
+    stats["store"] = dict(_store_stats)
+    stats["positive_ttl"] = UPC_CACHE_TTL
+    stats["negative_ttl"] = UPC_NEGATIVE_TTL
+    return stats
@@ -0,0 +1,45 @@
+import hashlib
+import os
+from tempfile import SpooledTemporaryFile
+
+from flask import Request, request
+
+# Uploads up to UPLOAD_SPOOL_BYTES stay in memory; only unusually large ones spill to disk.
+# Image routes call limit_upload_size(), so a body above UPLOAD_MAX_BYTES is refused with a 413
+# before it is read; only those routes are capped (imports can be much larger).
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", 8 * 1024 * 1024))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", 10 * 1024 * 1024))
+READ_CHUNK = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+# ✅ Werkzeug spools file parts to a temp file past 500KB; a typical phone photo is bigger
+# than that, so raise the in-memory threshold
+class SpooledRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES, mode="rb+")
+
+
+def limit_upload_size(max_bytes=UPLOAD_MAX_BYTES):
+    request.max_content_length = max_bytes
+
+
+# ✅ Reads an uploaded file into memory, hashing as it goes; returns (bytes, sha256 hex)
+def read_upload(file_storage, max_bytes=UPLOAD_MAX_BYTES):
+    digest = hashlib.sha256()
+    chunks, size = [], 0
+    stream = file_storage.stream
+    stream.seek(0)
+    while True:
+        chunk = stream.read(READ_CHUNK)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLarge(f"Upload is larger than {max_bytes} bytes")
+        digest.update(chunk)
+        chunks.append(chunk)
+    return b"".join(chunks), digest.hexdigest()